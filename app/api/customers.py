@@ -18,20 +18,23 @@ def create_customer(
 ):
     """Create a new customer"""
     customer_repo = CustomerRepository(db)
-    customer = customer_repo.create(
-        name=customer_data.name,
-        phone=customer_data.phone,
-        email=customer_data.email,
-        address=customer_data.address,
-        city=customer_data.city,
-        state=customer_data.state,
-        postcode=customer_data.postcode,
-        ic_number=customer_data.ic_number,
-        linked_seda_registration=customer_data.linked_seda_registration,
-        linked_old_customer=customer_data.linked_old_customer,
-        notes=customer_data.notes,
-        created_by=current_user.id,
-    )
+    try:
+        customer = customer_repo.create(
+            name=customer_data.name,
+            phone=customer_data.phone,
+            email=customer_data.email,
+            address=customer_data.address,
+            city=customer_data.city,
+            state=customer_data.state,
+            postcode=customer_data.postcode,
+            ic_number=customer_data.ic_number,
+            linked_seda_registration=customer_data.linked_seda_registration,
+            linked_old_customer=customer_data.linked_old_customer,
+            notes=customer_data.notes,
+            created_by=current_user.id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     return customer
 
 
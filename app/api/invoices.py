@@ -13,10 +13,14 @@ from app.schemas.invoice import (
     InvoiceListResponse, GenerateShareLinkResponse,
     InvoiceOnTheFlyRequest
 )
-from app.repositories.invoice_repo import InvoiceRepository
+from app.schemas import _adapters as adapters
+from app.schemas._adapters import dump_json
+from app.repositories.invoice_repo import InvoiceRepository, line_total
 from app.repositories.customer_repo import CustomerRepository
 from app.middleware.auth import get_current_user, get_api_key_user, get_optional_user, get_request_ip
 from app.models.user import User
+from app.models.voucher import Voucher
+from app.models.package import Package
 from app.config import settings
 from app.utils.html_generator import generate_invoice_html
 from app.utils.pdf_generator import generate_invoice_pdf, sanitize_filename
@@ -40,23 +44,25 @@ def create_invoice(
     if invoice_data.customer_id:
         customer = customer_repo.get_by_id(invoice_data.customer_id)
 
-    # If no customer_id, create new customer
+    # If no customer_id, create new customer (or reuse the one with the same name/phone)
     if not customer:
-        customer = customer_repo.create(
-            name=invoice_data.customer_name or "Customer",
-            phone=invoice_data.customer_phone,
-            email=invoice_data.customer_email,
-            address=invoice_data.customer_address,
-            created_by=current_user.id,
-        )
+        customer_name = invoice_data.customer_name or "Customer"
+        try:
+            customer = customer_repo.create(
+                name=customer_name,
+                phone=invoice_data.customer_phone,
+                email=invoice_data.customer_email,
+                address=invoice_data.customer_address,
+                created_by=current_user.id,
+            )
+        except ValueError:
+            customer = customer_repo.get_by_name_phone(customer_name, invoice_data.customer_phone)
 
     # Calculate item totals
     items = []
     for item in invoice_data.items:
-        qty = Decimal(str(item.qty))
-        unit_price = Decimal(str(item.unit_price))
-        discount_percent = Decimal(str(item.discount_percent or 0))
-        total_price = qty * unit_price * (1 - discount_percent / Decimal(100))
+        # Same integer-cents rounding as add_item/update_item
+        total_price = line_total(item.qty, item.unit_price, item.discount_percent)
 
         items.append({
             "product_id": item.product_id,
@@ -128,9 +134,6 @@ def validate_voucher(
     db: Session = Depends(get_db)
 ):
     """Validate a voucher code for a specific package"""
-    from app.models.voucher import Voucher
-    from app.models.package import Package
-    
     voucher = db.query(Voucher).filter(Voucher.voucher_code == code, Voucher.active == True).first()
     if not voucher:
         raise HTTPException(status_code=404, detail="Invalid or inactive voucher code")
@@ -168,8 +171,6 @@ async def create_invoice_on_the_fly(
     
     # Parse discount_given string into discount_fixed and discount_percent
     # Input format: "500 10%" or "500" or "10%"
-    from decimal import Decimal
-    
     discount_fixed = Decimal(0)
     discount_percent = Decimal(0)
     
@@ -252,12 +253,13 @@ def list_invoices(
         date_to=date_to,
     )
 
-    return InvoiceListResponse(
-        total=total,
-        page=(skip // limit) + 1,
-        page_size=limit,
-        invoices=invoices,
-    )
+    # ORM rows in a dict - validated and encoded in one pydantic-core pass
+    return Response(content=dump_json(adapters.INVOICE_LIST, {
+        "total": total,
+        "page": (skip // limit) + 1,
+        "page_size": limit,
+        "invoices": invoices,
+    }), media_type="application/json")
 
 
 @router.get("/{bubble_id}", response_model=InvoiceResponse)
@@ -276,7 +278,7 @@ def get_invoice(
             detail="Invoice not found"
         )
 
-    return invoice
+    return Response(content=dump_json(adapters.INVOICE, invoice), media_type="application/json")
 
 
 @router.get("/{bubble_id}/pdf")
@@ -441,9 +443,9 @@ def add_invoice_item(
         product_id=item_data.product_id,
         product_name_snapshot=item_data.product_name_snapshot,
         description=item_data.description,
-        qty=Decimal(str(item_data.qty)),
-        unit_price=Decimal(str(item_data.unit_price)),
-        discount_percent=Decimal(str(item_data.discount_percent or 0)),
+        qty=item_data.qty,
+        unit_price=item_data.unit_price,
+        discount_percent=item_data.discount_percent or Decimal(0),
         sort_order=item_data.sort_order,
     )
 
@@ -461,13 +463,8 @@ def update_invoice_item(
     """Update invoice item"""
     invoice_repo = InvoiceRepository(db)
 
+    # qty/unit_price/discount_percent are already Decimal from the schema
     update_data = {k: v for k, v in item_data.model_dump(exclude_none=True).items() if v is not None}
-    if "qty" in update_data:
-        update_data["qty"] = Decimal(str(update_data["qty"]))
-    if "unit_price" in update_data:
-        update_data["unit_price"] = Decimal(str(update_data["unit_price"]))
-    if "discount_percent" in update_data:
-        update_data["discount_percent"] = Decimal(str(update_data["discount_percent"]))
 
     item = invoice_repo.update_item(item_id, **update_data)
 
@@ -521,7 +518,7 @@ def add_payment(
 
     payment = invoice_repo.add_payment(
         invoice_id=bubble_id,
-        amount=Decimal(str(payment_data.amount)),
+        amount=payment_data.amount,
         payment_method=payment_data.payment_method,
         payment_date=payment_data.payment_date,
         reference_no=payment_data.reference_no,
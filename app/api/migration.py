@@ -52,8 +52,7 @@ def migrate_old_invoices(
         LIMIT :limit
     """)
     
-    result = db.execute(query, {"limit": limit})
-    old_invoices = [dict(row) for row in result]
+    old_invoices = db.execute(query, {"limit": limit}).mappings().all()
 
     if not old_invoices:
         return {
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List
 import csv
 import io
-from app.database import get_db
+from app.database import get_db, unit_of_work
 from app.middleware.auth import get_current_user
 from app.models.user import User
 from app.repositories.package_repo import PackageRepository
@@ -22,10 +22,21 @@ from app.schemas.package import (
     BrandListResponse,
     PackageImport
 )
+from app.schemas import _adapters as adapters
+from app.schemas._adapters import dump_json
 from decimal import Decimal
 
 router = APIRouter(prefix="/api/v1/packages", tags=["Package Management"])
 
+# Response fields read straight off the ORM row (items/brand_name are filled in by the route)
+_PACKAGE_FIELDS = tuple(name for name in PackageResponse.model_fields if name != "items")
+_PRODUCT_FIELDS = tuple(name for name in ProductResponse.model_fields if name != "brand_name")
+
+
+def _columns_dict(row, fields) -> dict:
+    """Copy the response fields off an ORM row - the dict is validated once, on the way out"""
+    return {name: getattr(row, name) for name in fields}
+
 
 @router.get("/export", response_class=StreamingResponse)
 def export_packages(
@@ -106,7 +117,8 @@ async def import_packages(
         return {"status": "error", "message": "No valid data found in file"}
 
     repo = PackageRepository(db)
-    result = repo.bulk_update_from_import(import_data)
+    with unit_of_work(db):
+        result = repo.bulk_update_from_import(import_data)
     
     return {
         "status": "success",
@@ -122,69 +134,55 @@ def list_packages(
     active_only: Optional[bool] = Query(None, description="Filter by active status"),
     type: Optional[str] = Query(None, description="Filter by package type"),
     search: Optional[str] = Query(None, description="Search in name, description"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count matching rows (default: only when no cursor is given)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """List all packages"""
     repo = PackageRepository(db)
-    packages, total = repo.list_packages(
-        skip=skip,
-        limit=limit,
-        active_only=active_only,
-        package_type=type,
-        search=search
-    )
+    try:
+        packages, total, next_cursor = repo.list_packages(
+            skip=skip,
+            limit=limit,
+            active_only=active_only,
+            package_type=type,
+            search=search,
+            cursor=cursor,
+            include_total=cursor is None if include_total is None else include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    # Enrich packages with items
+    # Enrich packages with items (one query for the whole page)
+    # Plain dicts - validated once, by the response model
+    items_by_package = repo.get_items_for_packages(packages)
     enriched_packages = []
     for package in packages:
-        package_data = PackageResponse.model_validate(package)
-        package_dict = package_data.model_dump()
-        
-        # Get items
-        if package.linked_package_item:
-            items_query = """
-                SELECT 
-                    pi.bubble_id,
-                    pi.product as product_id,
-                    pi.qty,
-                    pi.total_cost,
-                    pi.sort,
-                    pi.inventory,
-                    p.name as product_name,
-                    b.name as brand_name
-                FROM package_item pi
-                LEFT JOIN product p ON p.bubble_id = pi.product
-                LEFT JOIN brand b ON b.bubble_id = p.linked_brand
-                WHERE pi.bubble_id = ANY(:item_ids)
-                ORDER BY pi.sort NULLS LAST, pi.created_date
-            """
-            from sqlalchemy import text
-            items = db.execute(text(items_query), {"item_ids": package.linked_package_item}).fetchall()
-            package_dict["items"] = [
-                {
-                    "bubble_id": item.bubble_id,
-                    "product_id": item.product_id,
-                    "product_name": item.product_name,
-                    "brand_name": item.brand_name,
-                    "qty": item.qty,
-                    "total_cost": item.total_cost,
-                    "sort": item.sort,
-                    "inventory": item.inventory
-                }
-                for item in items
-            ]
-        else:
-            package_dict["items"] = []
-        
-        enriched_packages.append(PackageResponse(**package_dict))
-    
-    return PackageListResponse(
-        total=total,
-        page=(skip // limit) + 1,
-        page_size=limit,
-        packages=enriched_packages
-    )
+        package_dict = _columns_dict(package, _PACKAGE_FIELDS)
+        package_dict["items"] = [
+            {
+                "bubble_id": item["bubble_id"],
+                "product_id": item["product"],
+                "product_name": item["product_name"],
+                "brand_name": item["brand_name"],
+                "qty": item["qty"],
+                "total_cost": item["total_cost"],
+                "sort": item["sort"],
+                "inventory": item["inventory"]
+            }
+            for item in items_by_package[package.bubble_id]
+        ]
+        enriched_packages.append(package_dict)
+    
+    return Response(content=dump_json(adapters.PACKAGE_LIST, {
+        "total": total,
+        "page": (skip // limit) + 1,
+        "page_size": limit,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+        "packages": enriched_packages,
+    }), media_type="application/json")
 
 
 @router.get("/{bubble_id}", response_model=PackageResponse)
@@ -204,8 +202,7 @@ def get_package(
         )
     
     package = package_data["package"]
-    package_response = PackageResponse.model_validate(package)
-    package_dict = package_response.model_dump()
+    package_dict = _columns_dict(package, _PACKAGE_FIELDS)
     
     # Add items
     items = []
@@ -222,7 +219,7 @@ def get_package(
         ))
     
     package_dict["items"] = items
-    return PackageResponse(**package_dict)
+    return package_dict
 
 
 @router.post("", response_model=PackageResponse, status_code=status.HTTP_201_CREATED)
@@ -234,22 +231,24 @@ def create_package(
     """Create a new package"""
     repo = PackageRepository(db)
     
-    package = repo.create_package(
-        name=package_data.name,
-        price=package_data.price,
-        panel=package_data.panel,
-        panel_qty=package_data.panel_qty,
-        package_type=package_data.type,
-        active=package_data.active,
-        invoice_desc=package_data.invoice_desc,
-        description=package_data.description,
-        max_discount=package_data.max_discount,
-        special=package_data.special,
-        need_approval=package_data.need_approval,
-        password=package_data.password,
-        linked_package_items=package_data.linked_package_items,
-        created_by=current_user.id
-    )
+    with unit_of_work(db):
+        package = repo.create_package(
+            name=package_data.name,
+            price=package_data.price,
+            panel=package_data.panel,
+            panel_qty=package_data.panel_qty,
+            package_type=package_data.type,
+            active=package_data.active,
+            invoice_desc=package_data.invoice_desc,
+            description=package_data.description,
+            max_discount=package_data.max_discount,
+            special=package_data.special,
+            need_approval=package_data.need_approval,
+            password=package_data.password,
+            linked_package_items=package_data.linked_package_items,
+            created_by=current_user.id,
+            items=[item.model_dump() for item in package_data.items or []],
+        )
     
     return PackageResponse.model_validate(package)
 
@@ -264,22 +263,23 @@ def update_package(
     """Update package"""
     repo = PackageRepository(db)
     
-    package = repo.update_package(
-        bubble_id=bubble_id,
-        name=package_data.name,
-        price=package_data.price,
-        panel=package_data.panel,
-        panel_qty=package_data.panel_qty,
-        package_type=package_data.type,
-        active=package_data.active,
-        invoice_desc=package_data.invoice_desc,
-        description=package_data.description,
-        max_discount=package_data.max_discount,
-        special=package_data.special,
-        need_approval=package_data.need_approval,
-        password=package_data.password,
-        linked_package_items=package_data.linked_package_items
-    )
+    with unit_of_work(db):
+        package = repo.update_package(
+            bubble_id=bubble_id,
+            name=package_data.name,
+            price=package_data.price,
+            panel=package_data.panel,
+            panel_qty=package_data.panel_qty,
+            package_type=package_data.type,
+            active=package_data.active,
+            invoice_desc=package_data.invoice_desc,
+            description=package_data.description,
+            max_discount=package_data.max_discount,
+            special=package_data.special,
+            need_approval=package_data.need_approval,
+            password=package_data.password,
+            linked_package_items=package_data.linked_package_items
+        )
     
     if not package:
         raise HTTPException(
@@ -299,7 +299,9 @@ def delete_package(
     """Delete package"""
     repo = PackageRepository(db)
     
-    if not repo.delete_package(bubble_id):
+    with unit_of_work(db):
+        deleted = repo.delete_package(bubble_id)
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Package not found"
@@ -324,13 +326,14 @@ def create_package_item(
             detail="Product not found"
         )
     
-    item = repo.create_package_item(
-        product_id=item_data.product_id,
-        qty=item_data.qty,
-        total_cost=item_data.total_cost,
-        sort=item_data.sort,
-        created_by=current_user.id
-    )
+    with unit_of_work(db):
+        item = repo.create_package_item(
+            product_id=item_data.product_id,
+            qty=item_data.qty,
+            total_cost=item_data.total_cost,
+            sort=item_data.sort,
+            created_by=current_user.id
+        )
     
     # Get product and brand info
     product = repo.get_product(item.product)
@@ -368,13 +371,14 @@ def update_package_item(
                 detail="Product not found"
             )
     
-    item = repo.update_package_item(
-        bubble_id=bubble_id,
-        product_id=item_data.product_id,
-        qty=item_data.qty,
-        total_cost=item_data.total_cost,
-        sort=item_data.sort
-    )
+    with unit_of_work(db):
+        item = repo.update_package_item(
+            bubble_id=bubble_id,
+            product_id=item_data.product_id,
+            qty=item_data.qty,
+            total_cost=item_data.total_cost,
+            sort=item_data.sort
+        )
     
     if not item:
         raise HTTPException(
@@ -409,7 +413,9 @@ def delete_package_item(
     """Delete package item"""
     repo = PackageRepository(db)
     
-    if not repo.delete_package_item(bubble_id):
+    with unit_of_work(db):
+        deleted = repo.delete_package_item(bubble_id)
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Package item not found"
@@ -424,35 +430,42 @@ def list_products(
     active_only: bool = Query(True, description="Show only active products"),
     search: Optional[str] = Query(None, description="Search products"),
     brand_id: Optional[str] = Query(None, description="Filter by brand"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count matching rows (default: only when no cursor is given)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """List all products"""
     repo = PackageRepository(db)
-    products, total = repo.list_products(
-        skip=skip,
-        limit=limit,
-        active_only=active_only,
-        search=search,
-        brand_id=brand_id
-    )
+    try:
+        products, total, next_cursor = repo.list_products(
+            skip=skip,
+            limit=limit,
+            active_only=active_only,
+            search=search,
+            brand_id=brand_id,
+            cursor=cursor,
+            include_total=cursor is None if include_total is None else include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    # Enrich with brand names
+    # Enrich with brand names (one query for the whole page)
+    brand_names = repo.get_brand_names([product.linked_brand for product in products])
     enriched_products = []
     for product in products:
-        product_dict = ProductResponse.model_validate(product).model_dump()
-        if product.linked_brand:
-            brand = repo.get_brand(product.linked_brand)
-            if brand:
-                product_dict["brand_name"] = brand.name
-        enriched_products.append(ProductResponse(**product_dict))
-    
-    return ProductListResponse(
-        total=total,
-        page=(skip // limit) + 1,
-        page_size=limit,
-        products=enriched_products
-    )
+        product_dict = _columns_dict(product, _PRODUCT_FIELDS)
+        product_dict["brand_name"] = brand_names.get(product.linked_brand)
+        enriched_products.append(product_dict)
+    
+    return Response(content=dump_json(adapters.PRODUCT_LIST, {
+        "total": total,
+        "page": (skip // limit) + 1,
+        "page_size": limit,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+        "products": enriched_products,
+    }), media_type="application/json")
 
 
 @router.get("/products/{bubble_id}", response_model=ProductResponse)
@@ -471,13 +484,13 @@ def get_product(
             detail="Product not found"
         )
     
-    product_dict = ProductResponse.model_validate(product).model_dump()
+    product_dict = _columns_dict(product, _PRODUCT_FIELDS)
     if product.linked_brand:
         brand = repo.get_brand(product.linked_brand)
         if brand:
             product_dict["brand_name"] = brand.name
     
-    return ProductResponse(**product_dict)
+    return product_dict
 
 
 # Brand endpoints
@@ -486,19 +499,29 @@ def list_brands(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     search: Optional[str] = Query(None, description="Search brands"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count matching rows (default: only when no cursor is given)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """List all brands"""
     repo = PackageRepository(db)
-    brands, total = repo.list_brands(skip=skip, limit=limit, search=search)
+    try:
+        brands, total, next_cursor = repo.list_brands(
+            skip=skip, limit=limit, search=search, cursor=cursor, include_total=cursor is None if include_total is None else include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    return BrandListResponse(
-        total=total,
-        page=(skip // limit) + 1,
-        page_size=limit,
-        brands=[BrandResponse.model_validate(brand) for brand in brands]
-    )
+    # BrandRow tuples - the response model reads them from attributes
+    return {
+        "total": total,
+        "page": (skip // limit) + 1,
+        "page_size": limit,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
+        "brands": brands,
+    }
 
 
 @router.get("/brands/{bubble_id}", response_model=BrandResponse)
@@ -517,6 +540,6 @@ def get_brand(
             detail="Brand not found"
         )
     
-    return BrandResponse.model_validate(brand)
+    return brand
 
 
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
-from app.database import get_db
+from app.database import get_db, unit_of_work
 from app.schemas.template import TemplateCreate, TemplateUpdate, TemplateResponse, TemplateListResponse
 from app.repositories.template_repo import TemplateRepository
 from app.middleware.auth import get_current_user
@@ -29,26 +29,24 @@ def create_template(
 
     template_repo = TemplateRepository(db)
 
-    # Convert logo_url to string if it's an HttpUrl
-    logo_url_str = str(template_data.logo_url) if template_data.logo_url else None
-
-    template = template_repo.create(
-        template_name=template_data.template_name,
-        company_name=template_data.company_name,
-        company_address=template_data.company_address,
-        company_phone=template_data.company_phone,
-        company_email=template_data.company_email,
-        sst_registration_no=template_data.sst_registration_no,
-        bank_name=template_data.bank_name,
-        bank_account_no=template_data.bank_account_no,
-        bank_account_name=template_data.bank_account_name,
-        logo_url=logo_url_str,
-        terms_and_conditions=template_data.terms_and_conditions,
-        disclaimer=template_data.disclaimer,
-        apply_sst=template_data.apply_sst,
-        is_default=template_data.is_default,
-        created_by=current_user.id,
-    )
+    with unit_of_work(db):
+        template = template_repo.create(
+            template_name=template_data.template_name,
+            company_name=template_data.company_name,
+            company_address=template_data.company_address,
+            company_phone=template_data.company_phone,
+            company_email=template_data.company_email,
+            sst_registration_no=template_data.sst_registration_no,
+            bank_name=template_data.bank_name,
+            bank_account_no=template_data.bank_account_no,
+            bank_account_name=template_data.bank_account_name,
+            logo_url=template_data.logo_url,
+            terms_and_conditions=template_data.terms_and_conditions,
+            disclaimer=template_data.disclaimer,
+            apply_sst=template_data.apply_sst,
+            is_default=template_data.is_default,
+            created_by=current_user.id,
+        )
     return template
 
 
@@ -76,21 +74,30 @@ def list_templates(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     active_only: Optional[bool] = True,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Count matching rows (default: only when no cursor is given)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """List all templates"""
     template_repo = TemplateRepository(db)
-    templates, total = template_repo.get_all(
-        skip=skip,
-        limit=limit,
-        active_only=active_only,
-    )
+    try:
+        templates, total, next_cursor = template_repo.get_all(
+            skip=skip,
+            limit=limit,
+            active_only=active_only,
+            cursor=cursor,
+            include_total=cursor is None if include_total is None else include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     return {
         "total": total,
         "page": (skip // limit) + 1,
         "page_size": limit,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "templates": [
             {
                 "bubble_id": t.bubble_id,
@@ -134,12 +141,10 @@ def update_template(
 
     template_repo = TemplateRepository(db)
 
-    # Convert logo_url to string if it's an HttpUrl
     update_data = template_data.model_dump(exclude_none=True)
-    if "logo_url" in update_data and update_data["logo_url"]:
-        update_data["logo_url"] = str(update_data["logo_url"])
 
-    template = template_repo.update(bubble_id, **update_data)
+    with unit_of_work(db):
+        template = template_repo.update(bubble_id, **update_data)
 
     if not template:
         raise HTTPException(
@@ -158,7 +163,8 @@ def delete_template(
 ):
     """Delete template (soft delete)"""
     template_repo = TemplateRepository(db)
-    success = template_repo.delete(bubble_id)
+    with unit_of_work(db):
+        success = template_repo.delete(bubble_id)
 
     if not success:
         raise HTTPException(
@@ -177,7 +183,8 @@ def set_default_template(
 ):
     """Set template as default"""
     template_repo = TemplateRepository(db)
-    template = template_repo.set_default(bubble_id)
+    with unit_of_work(db):
+        template = template_repo.set_default(bubble_id)
 
     if not template:
         raise HTTPException(
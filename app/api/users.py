@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import Optional, List
-from app.database import get_db
+from typing import Optional, List, Literal
+from app.database import get_db, unit_of_work
 from app.schemas.user import (
     UserResponse, UserCreate, UserUpdate, UserTagsUpdate,
     TagRegistryResponse, TagRegistryCreate
@@ -22,6 +22,9 @@ def list_users(
     search: Optional[str] = Query(None),
     sort_by: Optional[str] = Query("registration_date", description="Sort by: name, email, registration_date, whatsapp_number"),
     sort_order: Optional[str] = Query("desc", description="Sort order: asc or desc"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page (keyset pagination)"),
+    include_total: Optional[bool] = Query(None, description="Compute total (default: first page only)"),
+    search_mode: Literal["contains", "prefix"] = Query("contains", description="contains: match anywhere, prefix: match the start (autocomplete)"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -38,13 +41,19 @@ def list_users(
         sort_order = "desc"
     
     user_repo = UserRepository(db)
-    users, total = user_repo.get_all(
-        skip=skip, 
-        limit=limit, 
-        search=search,
-        sort_by=sort_by,
-        sort_order=sort_order
-    )
+    try:
+        users, total, next_cursor = user_repo.get_all(
+            skip=skip, 
+            limit=limit, 
+            search=search,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            cursor=cursor,
+            include_total=cursor is None if include_total is None else include_total,
+            search_mode=search_mode,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     return {
         "users": users,
@@ -52,7 +61,9 @@ def list_users(
         "skip": skip,
         "limit": limit,
         "sort_by": sort_by,
-        "sort_order": sort_order
+        "sort_order": sort_order,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
     }
 
 
@@ -256,11 +267,12 @@ def create_tag(
             detail=f"Tag '{tag_data.tag}' already exists"
         )
     
-    tag_registry = tag_repo.create_tag(
-        tag=tag_data.tag,
-        category=category,
-        description=tag_data.description
-    )
+    with unit_of_work(db):
+        tag_registry = tag_repo.create_tag(
+            tag=tag_data.tag,
+            category=category,
+            description=tag_data.description
+        )
     
     return TagRegistryResponse(
         tag=tag_registry.tag,
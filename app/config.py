@@ -28,6 +28,7 @@ class Settings(BaseSettings):
     INVOICE_NUMBER_LENGTH: int = 6
     DEFAULT_SST_RATE: float = 8.0
     SHARE_LINK_EXPIRY_DAYS: int = 7
+    USE_MINIJINJA: bool = False  # Render invoice HTML with MiniJinja (Rust) instead of Jinja2 - needs `pip install minijinja`
 
     # CORS
     CORS_ORIGINS: str = "*"  # Comma-separated origins, "*" allows all
@@ -9,7 +9,8 @@ from app.railway_db import (
     get_connection_info, 
     Base, 
     SessionLocal,
-    connect_with_retry
+    connect_with_retry,
+    unit_of_work
 )
 
 # Deep Root Cause Fix: Wrap engine in a lazy proxy to prevent top-level import crashes
@@ -33,5 +34,6 @@ __all__ = [
     'get_db', 
     'check_database_health', 
     'get_connection_info',
-    'connect_with_retry'
+    'connect_with_retry',
+    'unit_of_work'
 ]
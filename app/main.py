@@ -2,7 +2,7 @@ from typing import Optional
 from fastapi import FastAPI, Request, Response, status, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, RedirectResponse
 from sqlalchemy.orm import Session
 from app.config import settings
 # CRITICAL: Don't import routers at top level - they might fail and prevent app from starting
@@ -89,15 +89,24 @@ async def lifespan(app: FastAPI):
     
     # Start DB initialization in background
     asyncio.create_task(initialize_db())
+
+    # WhatsApp sends go through a queue drained by background workers
+    from app.services.whatsapp_service import whatsapp_service
+    whatsapp_service.start()
     
     yield
 
+    # Shutdown: stop the send workers and close the pooled WhatsApp HTTP client
+    await whatsapp_service.aclose()
+
 # Create FastAPI app
 app = FastAPI(
     title="EE Invoicing System",
     description="Modern invoicing system with WhatsApp authentication",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson encodes the (already JSON-ready) response bodies in C - big list pages are dominated by encoding
+    default_response_class=ORJSONResponse
 )
 
 # CRITICAL: Add absolute minimal route FIRST to test if routes work at all
@@ -2,12 +2,14 @@ from fastapi import Depends, HTTPException, status, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from app.database import get_db
-from app.utils.security import decode_access_token
+from app.utils.security import decode_access_token, verify_api_key_secret
 from app.models.user import User
 from app.models.auth import APIKey
 from app.config import settings
 from typing import Optional, List
+from datetime import datetime, timezone
 from urllib.parse import quote
 
 
@@ -78,7 +80,7 @@ def get_current_user(
     
     # Get user from database
     try:
-        user = db.query(User).filter(User.id == int(user_id)).first()
+        user = db.get(User, int(user_id))
         if not user or not user.active:
             raise credentials_exception
         return user
@@ -86,6 +88,27 @@ def get_current_user(
         raise credentials_exception
 
 
+def _verified_api_key(db: Session, api_key: str) -> Optional[APIKey]:
+    """
+    Active API key record for a "<key_id>.<secret>" key, or None
+    The secret is checked against the stored hash - a bare key_id is never enough
+    """
+    if not api_key.startswith("sk_"):
+        return None
+
+    # key_id is "sk_" + urlsafe base64 - no dots
+    key_id, _, key_secret = api_key.partition(".")
+    if not key_secret:
+        return None
+
+    key_record = db.scalar(select(APIKey).where(APIKey.key_id == key_id))
+    if key_record is None or not key_record.active:
+        return None
+    if not verify_api_key_secret(key_secret, key_record.key_hash):
+        return None
+    return key_record
+
+
 def get_api_key_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -101,17 +124,11 @@ def get_api_key_user(
         detail="Invalid API key",
     )
 
-    api_key = credentials.credentials
-    if not api_key.startswith("sk_"):
-        raise credentials_exception
-
-    # Find API key
-    key_record = db.query(APIKey).filter(APIKey.key_id == api_key).first()
-    if key_record is None or not key_record.active:
+    key_record = _verified_api_key(db, credentials.credentials)
+    if key_record is None:
         raise credentials_exception
 
     # Check expiration
-    from datetime import datetime, timezone
     if key_record.expires_at:
         # Handle timezone naive vs aware comparison
         expires_at = key_record.expires_at
@@ -127,7 +144,7 @@ def get_api_key_user(
     # Get user - created_by is now user.id (integer) as string
     try:
         created_by_int = int(key_record.created_by)
-        user = db.query(User).filter(User.id == created_by_int).first()
+        user = db.get(User, created_by_int)
         if user is None or not user.active:
             raise credentials_exception
         return user, key_record
@@ -145,11 +162,10 @@ def get_optional_user(
         auth_header = request.headers.get("Authorization")
         if auth_header and auth_header.startswith("Bearer sk_"):
             token = auth_header.replace("Bearer ", "")
-            key_record = db.query(APIKey).filter(APIKey.key_id == token).first()
-            
-            if key_record and key_record.active:
+            key_record = _verified_api_key(db, token)
+
+            if key_record:
                 # Check expiration
-                from datetime import datetime, timezone
                 expires_at = key_record.expires_at
                 if expires_at:
                     if expires_at.tzinfo is None:
@@ -160,7 +176,7 @@ def get_optional_user(
                 # created_by is now user.id (integer) as string
                 try:
                     created_by_int = int(key_record.created_by)
-                    user = db.query(User).filter(User.id == created_by_int).first()
+                    user = db.get(User, created_by_int)
                     return user if user and user.active else None
                 except (ValueError, TypeError):
                     return None
@@ -174,7 +190,7 @@ def get_optional_user(
                 if user_id:
                     try:
                         user_id_int = int(user_id)
-                        user = db.query(User).filter(User.id == user_id_int).first()
+                        user = db.get(User, user_id_int)
                         return user if user and user.active else None
                     except (ValueError, TypeError):
                         return None
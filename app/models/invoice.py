@@ -1,14 +1,18 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text, ForeignKey, ARRAY
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func, and_
+from sqlalchemy.sql import func, and_, text
 from app.database import Base
 
 
 class InvoiceNew(Base):
     __tablename__ = "invoice_new"
+    # Fetch server defaults (created_at, ...) via RETURNING in the same INSERT
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
-    bubble_id = Column(String, unique=True, nullable=False, index=True)
+    # Generated by the database (pgcrypto), returned by the INSERT via eager_defaults
+    bubble_id = Column(String, unique=True, nullable=False, index=True,
+                       server_default=text("'inv_' || encode(gen_random_bytes(8), 'hex')"))
 
     # Template
     template_id = Column(String)  # References invoice_template.bubble_id (no FK - new table)
@@ -76,8 +80,9 @@ class InvoiceNew(Base):
     paid_at = Column(DateTime(timezone=True))
 
     # Relationships
-    items = relationship("InvoiceNewItem", back_populates="invoice", cascade="all, delete-orphan")
-    payments = relationship("InvoicePaymentNew", back_populates="invoice", cascade="all, delete-orphan")
+    # passive_deletes: children are removed by ON DELETE CASCADE, not loaded and deleted one by one
+    items = relationship("InvoiceNewItem", back_populates="invoice", cascade="all, delete-orphan", passive_deletes=True)
+    payments = relationship("InvoicePaymentNew", back_populates="invoice", cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self):
         """Convert model to dictionary for JSON serialization"""
@@ -86,9 +91,11 @@ class InvoiceNew(Base):
 
 class InvoiceNewItem(Base):
     __tablename__ = "invoice_new_item"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
-    bubble_id = Column(String, unique=True, nullable=False, index=True)
+    bubble_id = Column(String, unique=True, nullable=False, index=True,
+                       server_default=text("'item_' || encode(gen_random_bytes(8), 'hex')"))
 
     invoice_id = Column(String, ForeignKey("invoice_new.bubble_id", ondelete="CASCADE"), index=True)
 
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -32,6 +34,15 @@ class Product(Base):
     created_by = Column(String)
     inverter_rating = Column(Integer)
 
+    # Generated full-text search column (migrations/add_product_search_vector.sql)
+    # Deferred - only used in WHERE, never loaded with the row
+    search_vec = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(label, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'C')",
+        persisted=True,
+    )))
+
 
 
 
@@ -20,7 +20,11 @@ class TagRegistry(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     tag = Column(String, unique=True, nullable=False, index=True)  # Unique tag string (e.g., "quote", "voucher")
-    category = Column(Enum(TagCategory), nullable=False)  # app, function, or department
+    # Stored as the lowercase value in a VARCHAR(20) column (see create_tag_registry_table.sql)
+    category = Column(
+        Enum(TagCategory, native_enum=False, length=20, values_callable=lambda enum: [member.value for member in enum]),
+        nullable=False,
+    )  # app, function, or department
     description = Column(String)  # Optional description of what this tag allows
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -3,10 +3,11 @@ User model mapping to production 'user' table
 All apps share the same database and use the 'user' table
 Auth Hub userId maps to user.id
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ARRAY
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ARRAY, Computed
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.database import Base
-import json
 from typing import Optional, List, Dict, Any
 
 
@@ -26,13 +27,29 @@ class User(Base):
     dealership = Column(String)
     created_date = Column(DateTime(timezone=True))
     linked_agent_profile = Column(String)
-    authentication = Column(Text)  # JSON string with email/whatsapp data
+    authentication = Column(JSONB)  # email/whatsapp data, loaded as a dict
     access_level = Column(ARRAY(String))  # Array of permission strings
     user_signed_up = Column(Boolean)
     profile_picture = Column(String)
     modified_date = Column(DateTime(timezone=True))
     agent_code = Column(String)
 
+    # Fallbacks extracted from authentication JSON (migrations/add_user_auth_generated_columns.sql)
+    # Deferred - read by UserRepository's SQL, never loaded with the row
+    auth_email = deferred(Column(Text, Computed(
+        "(authentication -> 'email') ->> 'email'",
+        persisted=True,
+    )))
+    auth_whatsapp = deferred(Column(Text, Computed(
+        "COALESCE("
+        "CASE WHEN jsonb_typeof(authentication -> 'whatsapp') = 'object' "
+        "THEN COALESCE((authentication -> 'whatsapp') ->> 'number', "
+        "(authentication -> 'whatsapp') ->> 'phone') "
+        "ELSE authentication ->> 'whatsapp' END, "
+        "authentication ->> 'phone')",
+        persisted=True,
+    )))
+
     # Properties for backward compatibility
     @property
     def user_id(self) -> str:
@@ -44,7 +61,7 @@ class User(Base):
         """Extract WhatsApp number from authentication JSON or token payload"""
         if self.authentication:
             try:
-                auth_data = json.loads(self.authentication)
+                auth_data = self.authentication
                 if isinstance(auth_data, dict):
                     if "whatsapp" in auth_data:
                         whatsapp_data = auth_data["whatsapp"]
@@ -67,7 +84,7 @@ class User(Base):
         """Extract name from authentication JSON or profile"""
         if self.authentication:
             try:
-                auth_data = json.loads(self.authentication)
+                auth_data = self.authentication
                 if isinstance(auth_data, dict):
                     if "name" in auth_data:
                         return auth_data["name"]
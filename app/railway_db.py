@@ -1,6 +1,7 @@
 import os
 import time
 import logging
+from contextlib import contextmanager
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -44,21 +45,38 @@ def get_railway_database_url() -> str:
     return url
 
 def create_railway_engine():
-    """Create SQLAlchemy engine with robust connection pooling."""
+    """
+    Create SQLAlchemy engine with robust connection pooling.
+
+    The repositories rely on this pool and on psycopg2 batch mode: concurrent
+    invoice creation needs pool_size/max_overflow headroom, and multi-row
+    inserts (invoice items, bulk sessions/API keys) rely on executemany
+    batching to go out in a single round trip.
+    """
     db_url = get_railway_database_url()
     
     # Sanitized host logging
     host = db_url.split("@")[1].split(":")[0] if "@" in db_url else "unknown"
     logger.info(f"Configuring database engine for host: {host}")
 
+    # Dead connections are detected by TCP keepalives instead of a
+    # SELECT 1 pre-ping on every checkout
     return create_engine(
         db_url,
-        pool_pre_ping=True,
-        pool_recycle=300,
-        pool_size=5,
-        max_overflow=10,
+        pool_pre_ping=False,
+        pool_recycle=1800,
+        pool_size=10,
+        max_overflow=20,
+        # Batch executemany() and multi-row INSERTs into as few round trips as possible
+        executemany_mode="values_plus_batch",
+        executemany_batch_page_size=500,
+        insertmanyvalues_page_size=1000,
         connect_args={
             "connect_timeout": 10,
+            "keepalives": 1,
+            "keepalives_idle": 60,
+            "keepalives_interval": 10,
+            "keepalives_count": 5,
             "options": "-c statement_timeout=30000"
         }
     )
@@ -78,7 +96,13 @@ def get_session_local():
     """Lazy session initialization."""
     global _SessionLocal
     if _SessionLocal is None:
-        _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+        _SessionLocal = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            # Keep committed objects loaded - avoids a reload SELECT on first access after commit
+            expire_on_commit=False,
+            bind=get_engine(),
+        )
     return _SessionLocal
 
 def SessionLocal(*args, **kwargs):
@@ -115,6 +139,19 @@ def get_db():
     finally:
         db.close()
 
+@contextmanager
+def unit_of_work(db):
+    """
+    Transaction boundary for one logical operation.
+    Repositories only flush; this commits once on success and rolls back on error.
+    """
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
 def check_database_health() -> bool:
     try:
         with get_engine().connect() as conn:
@@ -1,21 +1,56 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text, cast, String
+from sqlalchemy import text, cast, String, insert, select, lambda_stmt, bindparam
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List
 from app.models.user import User
 from app.models.auth import APIKey, AuthSession
-from app.utils.security import generate_otp, generate_share_token
+from app.utils.security import generate_otp, generate_share_token, hash_api_key_secret
 from app.config import settings
 import secrets
-import hashlib
 import json
 
 
+# Exact-match lookup on authentication JSON (index: user_auth_gin)
+_USER_BY_WHATSAPP_QUERY = text("""
+    SELECT id FROM "user"
+    WHERE authentication @> CAST(:by_whatsapp AS jsonb)
+       OR authentication @> CAST(:by_whatsapp_number AS jsonb)
+       OR authentication @> CAST(:by_whatsapp_phone AS jsonb)
+       OR authentication @> CAST(:by_phone AS jsonb)
+    LIMIT 1
+""")
+
+# INSERT ... RETURNING in one round trip (no refresh SELECT); reused so the compiled SQL is cached
+_INSERT_API_KEY = insert(APIKey).returning(APIKey)
+_INSERT_AUTH_SESSION = insert(AuthSession).returning(AuthSession)
+
+# Hot lookups as lambda statements so the compiled SQL is cached by lambda identity
+_GET_API_KEYS_BY_CREATOR = lambda_stmt(
+    lambda: select(APIKey).where(APIKey.created_by == bindparam("created_by"))
+)
+_GET_API_KEY_BY_KEY_ID = lambda_stmt(
+    lambda: select(APIKey).where(APIKey.key_id == bindparam("key_id"))
+)
+
 
 class AuthRepository:
     def __init__(self, db: Session):
         self.db = db
 
+    def _find_user_id_by_whatsapp(self, whatsapp: str):
+        """
+        Find user id by exact WhatsApp number in authentication JSON
+        Uses JSONB containment (@>) so the GIN index on authentication can be used
+        Covers {"whatsapp": "..."}, {"whatsapp": {"number"/"phone": "..."}} and {"phone": "..."}
+        """
+        result = self.db.execute(_USER_BY_WHATSAPP_QUERY, {
+            "by_whatsapp": json.dumps({"whatsapp": whatsapp}),
+            "by_whatsapp_number": json.dumps({"whatsapp": {"number": whatsapp}}),
+            "by_whatsapp_phone": json.dumps({"whatsapp": {"phone": whatsapp}}),
+            "by_phone": json.dumps({"phone": whatsapp}),
+        })
+        return result.fetchone()
+
     def get_or_create_user_by_whatsapp(self, whatsapp: str, name: Optional[str] = None) -> User:
         """
         Get or create user by WhatsApp number
@@ -23,17 +58,10 @@ class AuthRepository:
         Searches authentication JSON field for WhatsApp number
         """
         # Query user table by searching authentication JSON for WhatsApp number
-        # PostgreSQL JSON query: authentication->>'whatsapp' or authentication->>'phone'
-        query = text("""
-            SELECT id FROM "user" 
-            WHERE authentication::text LIKE :whatsapp_pattern
-            LIMIT 1
-        """)
-        result = self.db.execute(query, {"whatsapp_pattern": f"%{whatsapp}%"})
-        row = result.fetchone()
+        row = self._find_user_id_by_whatsapp(whatsapp)
         
         if row:
-            user = self.db.query(User).filter(User.id == row.id).first()
+            user = self.db.get(User, row.id)
             # Note: Can't update name/authentication JSON easily - users managed by Auth Hub
             return user
 
@@ -59,13 +87,7 @@ class AuthRepository:
         This method is deprecated - use Auth Hub OTP verification
         """
         # Query user by WhatsApp in authentication JSON
-        query = text("""
-            SELECT id FROM "user" 
-            WHERE authentication::text LIKE :whatsapp_pattern
-            LIMIT 1
-        """)
-        result = self.db.execute(query, {"whatsapp_pattern": f"%{whatsapp}%"})
-        row = result.fetchone()
+        row = self._find_user_id_by_whatsapp(whatsapp)
         
         if not row:
             return None
@@ -94,7 +116,7 @@ class AuthRepository:
                 return None
 
         # Get user
-        user = self.db.query(User).filter(User.id == row.id).first()
+        user = self.db.get(User, row.id)
         return user
 
     def update_user_role(self, user_id: str, role: str, permissions: Optional[List[str]] = None) -> User:
@@ -108,7 +130,7 @@ class AuthRepository:
         except (ValueError, TypeError):
             return None
             
-        user = self.db.query(User).filter(User.id == user_id_int).first()
+        user = self.db.get(User, user_id_int)
         if user:
             # Update access_level array (role is derived from this)
             # Note: This is a simplified update - full role management should be via Auth Hub
@@ -118,47 +140,86 @@ class AuthRepository:
             self.db.refresh(user)
         return user
 
-    def create_api_key(
+    def _build_api_key_row(
         self,
-        created_by: int,  # Now integer (user.id)
+        created_by: int,
         service_name: str,
         app_domain: str,
         permissions: List[str],
         expires_in_days: Optional[int] = None
-    ) -> tuple[APIKey, str]:
-        """Create a new API key"""
+    ) -> tuple[dict, str]:
+        """Build api_key insert values. Returns (row, full_key)"""
         key_id = f"sk_{secrets.token_urlsafe(32)}"
         key_secret = secrets.token_urlsafe(48)
-        key_hash = hashlib.sha256(key_secret.encode()).hexdigest()
+        key_hash = hash_api_key_secret(key_secret)
 
         expires_at = None
         if expires_in_days:
             expires_at = datetime.now(timezone.utc) + timedelta(days=expires_in_days)
 
-        api_key = APIKey(
-            key_id=key_id,
-            key_hash=key_hash,
-            service_name=service_name,
-            app_domain=app_domain,
-            permissions=permissions,
-            active=True,
-            expires_at=expires_at,
-            created_by=str(created_by),  # Store as string for compatibility
+        row = {
+            "key_id": key_id,
+            "key_hash": key_hash,
+            "service_name": service_name,
+            "app_domain": app_domain,
+            "permissions": permissions,
+            "active": True,
+            "expires_at": expires_at,
+            "created_by": str(created_by),  # Store as string for compatibility
+        }
+        return row, f"{key_id}.{key_secret}"
+
+    def create_api_key(
+        self,
+        created_by: int,  # Now integer (user.id)
+        service_name: str,
+        app_domain: str,
+        permissions: List[str],
+        expires_in_days: Optional[int] = None
+    ) -> tuple[APIKey, str]:
+        """Create a new API key"""
+        row, full_key = self._build_api_key_row(
+            created_by, service_name, app_domain, permissions, expires_in_days
         )
-        self.db.add(api_key)
+        api_key = self.db.execute(_INSERT_API_KEY, row).scalar_one()
         self.db.commit()
-        self.db.refresh(api_key)
 
-        return api_key, f"{key_id}.{key_secret}"
+        return api_key, full_key
+
+    def create_api_keys_bulk(self, created_by: int, keys: List[dict]) -> List[str]:
+        """
+        Create multiple API keys in a single round trip (batch provisioning)
+        Each dict takes service_name, app_domain, permissions and optional expires_in_days
+        Returns the full keys ("key_id.secret") in input order - only shown once
+        """
+        if not keys:
+            return []
+
+        rows = []
+        full_keys = []
+        for key in keys:
+            row, full_key = self._build_api_key_row(
+                created_by,
+                key["service_name"],
+                key["app_domain"],
+                key["permissions"],
+                key.get("expires_in_days"),
+            )
+            rows.append(row)
+            full_keys.append(full_key)
+
+        self.db.execute(insert(APIKey), rows)
+        self.db.commit()
+        return full_keys
 
     def get_api_keys(self, user_id: str) -> List[APIKey]:
         """Get all API keys for a user"""
         # user_id is string, created_by is stored as string
-        return self.db.query(APIKey).filter(APIKey.created_by == user_id).all()
+        return list(self.db.scalars(_GET_API_KEYS_BY_CREATOR, {"created_by": user_id}))
 
     def revoke_api_key(self, key_id: str) -> bool:
         """Revoke an API key"""
-        api_key = self.db.query(APIKey).filter(APIKey.key_id == key_id).first()
+        api_key = self.db.scalar(_GET_API_KEY_BY_KEY_ID, {"key_id": key_id})
         if api_key:
             api_key.active = False
             self.db.commit()
@@ -168,19 +229,30 @@ class AuthRepository:
     def create_session(self, user_id: int, token_hash: str, expires_at: datetime, ip: Optional[str] = None, user_agent: Optional[str] = None) -> AuthSession:
         """Create a new session"""
         session_id = generate_share_token()
-        session = AuthSession(
-            session_id=session_id,
-            user_id=user_id,  # Now integer
-            token_hash=token_hash,
-            expires_at=expires_at,
-            ip_address=ip,
-            user_agent=user_agent,
-        )
-        self.db.add(session)
+        session = self.db.execute(_INSERT_AUTH_SESSION, {
+            "session_id": session_id,
+            "user_id": user_id,  # Now integer
+            "token_hash": token_hash,
+            "expires_at": expires_at,
+            "ip_address": ip,
+            "user_agent": user_agent,
+        }).scalar_one()
         self.db.commit()
-        self.db.refresh(session)
         return session
 
+    def create_sessions_bulk(self, rows: List[dict]) -> int:
+        """
+        Create multiple sessions in a single round trip
+        Each dict takes user_id, token_hash, expires_at and optional ip_address/user_agent
+        """
+        if not rows:
+            return 0
+
+        rows = [{"session_id": generate_share_token(), **row} for row in rows]
+        self.db.execute(insert(AuthSession), rows)
+        self.db.commit()
+        return len(rows)
+
     def cleanup_expired_sessions(self) -> int:
         """Clean up expired sessions"""
         deleted = self.db.query(AuthSession).filter(
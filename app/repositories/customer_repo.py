@@ -1,10 +1,39 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, lambda_stmt, bindparam, func
+from sqlalchemy.exc import IntegrityError
 from typing import Optional, List
 from datetime import datetime, timezone
 from app.models.customer import Customer
 import secrets
 
 
+# INSERT ... RETURNING in one round trip (no refresh SELECT)
+_INSERT_CUSTOMER = insert(Customer).returning(Customer)
+
+# Hot lookups as lambda statements so the compiled SQL is cached by lambda identity
+_GET_CUSTOMER_BY_ID = lambda_stmt(
+    lambda: select(Customer).where(Customer.customer_id == bindparam("customer_id"))
+)
+_GET_CUSTOMER_BY_PHONE = lambda_stmt(
+    lambda: select(Customer).where(Customer.phone == bindparam("phone")).limit(1)
+)
+_GET_CUSTOMER_BY_NAME_PHONE = lambda_stmt(
+    lambda: select(Customer).where(
+        func.lower(Customer.name) == func.lower(bindparam("name")),
+        Customer.phone == bindparam("phone"),
+    ).limit(1)
+)
+
+# Unique index on (lower(name), phone) - migrations/add_customer_name_phone_unique_index.sql
+_NAME_PHONE_INDEX = "ix_customer_name_phone"
+
+
+def _violated_constraint(error: IntegrityError) -> Optional[str]:
+    """Name of the constraint/index behind an IntegrityError (psycopg2 diagnostics)"""
+    diag = getattr(error.orig, "diag", None)
+    return getattr(diag, "constraint_name", None)
+
+
 class CustomerRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -24,35 +53,46 @@ class CustomerRepository:
         notes: Optional[str] = None,
         created_by: Optional[str] = None,
     ) -> Customer:
-        """Create a new customer"""
+        """
+        Create a new customer
+        Raises ValueError if a customer with the same name (case-insensitive) and phone exists
+        """
         customer_id = f"cust_{secrets.token_hex(8)}"
-        customer = Customer(
-            customer_id=customer_id,
-            name=name,
-            phone=phone,
-            email=email,
-            address=address,
-            city=city,
-            state=state,
-            postcode=postcode,
-            ic_number=ic_number,
-            linked_seda_registration=linked_seda_registration,
-            linked_old_customer=linked_old_customer,
-            notes=notes,
-            created_by=created_by,
-        )
-        self.db.add(customer)
-        self.db.commit()
-        self.db.refresh(customer)
+        try:
+            customer = self.db.execute(_INSERT_CUSTOMER, {
+                "customer_id": customer_id,
+                "name": name,
+                "phone": phone,
+                "email": email,
+                "address": address,
+                "city": city,
+                "state": state,
+                "postcode": postcode,
+                "ic_number": ic_number,
+                "linked_seda_registration": linked_seda_registration,
+                "linked_old_customer": linked_old_customer,
+                "notes": notes,
+                "created_by": created_by,
+            }).scalar_one()
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            if _violated_constraint(e) != _NAME_PHONE_INDEX:
+                raise
+            raise ValueError(f"Customer already exists: {name} ({phone})") from e
         return customer
 
     def get_by_id(self, customer_id: str) -> Optional[Customer]:
         """Get customer by ID"""
-        return self.db.query(Customer).filter(Customer.customer_id == customer_id).first()
+        return self.db.scalar(_GET_CUSTOMER_BY_ID, {"customer_id": customer_id})
 
     def get_by_phone(self, phone: str) -> Optional[Customer]:
         """Get customer by phone number"""
-        return self.db.query(Customer).filter(Customer.phone == phone).first()
+        return self.db.scalar(_GET_CUSTOMER_BY_PHONE, {"phone": phone})
+
+    def get_by_name_phone(self, name: str, phone: str) -> Optional[Customer]:
+        """Get customer by case-insensitive name and phone (index: ix_customer_name_phone)"""
+        return self.db.scalar(_GET_CUSTOMER_BY_NAME_PHONE, {"name": name, "phone": phone})
 
     def get_all(
         self,
@@ -1,8 +1,9 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload, joinedload, raiseload
+from sqlalchemy import or_, and_, text, insert, select, func, inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import Optional, List
 from datetime import datetime, timedelta, timezone
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 from app.models.invoice import InvoiceNew, InvoiceNewItem, InvoicePaymentNew, AuditLog
 from app.models.package import Package
 from app.models.voucher import Voucher
@@ -11,29 +12,182 @@ from app.models.template import InvoiceTemplate
 from app.utils.security import generate_share_token
 from app.config import settings
 import secrets
-import json
+import time
+import orjson
+
+
+_NEXT_INVOICE_NUMBER = text("SELECT nextval('invoice_number_seq')")
+
+
+def _today_str() -> str:
+    """Today's UTC date as YYYY-MM-DD (date.isoformat, no strftime format parsing)"""
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _to_decimal(value) -> Decimal:
+    """Coerce to Decimal, passing Decimals through without a str() round trip"""
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _to_cents(value) -> int:
+    """Amount -> integer cents (2 decimal places, rounded half away from zero)"""
+    return int(_to_decimal(value).scaleb(2).to_integral_value(ROUND_HALF_UP))
+
+
+def _from_cents(cents: int) -> Decimal:
+    """Integer cents -> Decimal amount with 2 decimal places"""
+    return Decimal(cents).scaleb(-2)
+
+
+def _div_round(numerator: int, denominator: int) -> int:
+    """Integer division rounded half away from zero (same as ROUND_HALF_UP)"""
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if remainder * 2 >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def line_total(qty, unit_price, discount_percent) -> Decimal:
+    """qty * unit_price * (1 - discount_percent / 100), computed in integer cents"""
+    qty_hundredths = _to_cents(qty)
+    price_cents = _to_cents(unit_price)
+    discount_bp = _to_cents(discount_percent or 0)
+    return _from_cents(_div_round(qty_hundredths * price_cents * (10000 - discount_bp), 100 * 10000))
+
+
+# Process-level cache of template lookups used on every invoice create/render:
+# key -> (expires_at, value). The TTL bounds staleness across worker processes;
+# within a process TemplateRepository invalidates on every template write.
+_TEMPLATE_CACHE_TTL_SECONDS = 300
+_DEFAULT_TEMPLATE_KEY = "__default__"
+_DEFAULT_TEMPLATE_DATA_KEY = "data:__default__"
+_MISSING = object()
+_template_cache: dict = {}
+
+
+def _template_cache_get(key: str):
+    entry = _template_cache.get(key)
+    if entry is None or entry[0] < time.monotonic():
+        return _MISSING
+    return entry[1]
+
+
+def _template_cache_set(key: str, value) -> None:
+    _template_cache[key] = (time.monotonic() + _TEMPLATE_CACHE_TTL_SECONDS, value)
+
+
+# Template columns used when rendering invoices (HTML/PDF)
+_TEMPLATE_COLUMNS = """
+    bubble_id, template_name, company_name, company_address, company_phone,
+    company_email, sst_registration_no, bank_name, bank_account_no,
+    bank_account_name, logo_url, terms_and_conditions, disclaimer, apply_sst
+"""
+_TEMPLATE_BY_ID = text(f"SELECT {_TEMPLATE_COLUMNS} FROM invoice_template WHERE bubble_id = :id")
+_DEFAULT_TEMPLATE = text(
+    f"SELECT {_TEMPLATE_COLUMNS} FROM invoice_template WHERE is_default = True AND active = True LIMIT 1"
+)
+_ANY_ACTIVE_TEMPLATE = text(f"SELECT {_TEMPLATE_COLUMNS} FROM invoice_template WHERE active = True LIMIT 1")
+
+# Old invoices with no invoice_new row yet (anti-join on the unique
+# invoice_new.linked_old_invoice index), keyset-paginated by bubble_id
+_UNMIGRATED_OLD_INVOICES = text("""
+    SELECT i.*, array_agg(jsonb_build_object(
+        'bubble_id', ii.bubble_id,
+        'description', ii.description,
+        'qty', ii.qty,
+        'unit_price', ii.unit_price,
+        'amount', ii.amount
+    )) as items
+    FROM invoice i
+    LEFT JOIN invoice_new inv ON inv.linked_old_invoice = i.bubble_id
+    LEFT JOIN invoice_item ii ON i.bubble_id = ii.linked_invoice
+    WHERE inv.id IS NULL
+      AND i.bubble_id > :cursor
+    GROUP BY i.bubble_id
+    ORDER BY i.bubble_id
+    LIMIT :limit
+""")
+
+
+def _column_values(obj) -> dict:
+    """Loaded column values straight from the instance state (no per-column getattr)"""
+    state = inspect(obj).dict
+    return {key: state[key] for key in obj.__table__.columns.keys() if key in state}
+
+
+def _audit_default(value):
+    """orjson fallback for types it does not serialize natively"""
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _dump_audit_values(values) -> str:
+    """Serialize audit old/new values (datetimes are handled natively by orjson)"""
+    return orjson.dumps(values, default=_audit_default).decode()
+
+
+# Customer de-dup key for create_on_the_fly - must match ix_customer_name_phone
+_CUSTOMER_CONFLICT_TARGET = [func.lower(Customer.name), Customer.phone]
+
+# Batched INSERT ... RETURNING for invoice items (one round trip per invoice)
+_INSERT_ITEMS = insert(InvoiceNewItem).returning(InvoiceNewItem)
 
 
 class InvoiceRepository:
+    """
+    Invoice data access
+    Requires a Session from the pooled engine in app.railway_db (batch executemany
+    mode is what makes the multi-item inserts a single round trip)
+    """
+
     def __init__(self, db: Session):
         self.db = db
 
-    def _generate_invoice_number(self) -> str:
-        """Generate next invoice number"""
-        # Find the highest invoice number
-        last_invoice = self.db.query(InvoiceNew).order_by(
-            InvoiceNew.invoice_number.desc()
-        ).first()
+    def _get_default_template_id(self) -> Optional[str]:
+        """Get bubble_id of the default active template (cached per process)"""
+        cached = _template_cache_get(_DEFAULT_TEMPLATE_KEY)
+        if cached is not _MISSING:
+            return cached
 
-        if last_invoice:
-            # Extract number part (after INV-)
-            try:
-                last_num = int(last_invoice.invoice_number.replace(settings.INVOICE_NUMBER_PREFIX + "-", ""))
-                next_num = last_num + 1
-            except:
-                next_num = 1
+        template_id = self.db.scalar(
+            select(InvoiceTemplate.bubble_id).where(
+                InvoiceTemplate.is_default == True,
+                InvoiceTemplate.active == True
+            ).limit(1)
+        )
+        _template_cache_set(_DEFAULT_TEMPLATE_KEY, template_id)
+        return template_id
+
+    def _get_template_apply_sst(self, template_id: str) -> Optional[bool]:
+        """Get a template's apply_sst flag (cached per process). None if template not found"""
+        cached = _template_cache_get(template_id)
+        if cached is not _MISSING:
+            return cached
+
+        row = self.db.execute(
+            select(InvoiceTemplate.apply_sst).where(InvoiceTemplate.bubble_id == template_id)
+        ).first()
+        apply_sst = bool(row.apply_sst) if row else None
+        _template_cache_set(template_id, apply_sst)
+        return apply_sst
+
+    @staticmethod
+    def invalidate_template_cache(template_id: Optional[str] = None) -> None:
+        """Drop cached template lookups. Call after any template create/update/delete"""
+        if template_id is None:
+            _template_cache.clear()
         else:
-            next_num = 1
+            _template_cache.pop(template_id, None)
+            _template_cache.pop(f"data:{template_id}", None)
+            _template_cache.pop(_DEFAULT_TEMPLATE_KEY, None)
+            _template_cache.pop(_DEFAULT_TEMPLATE_DATA_KEY, None)
+
+    def _generate_invoice_number(self) -> str:
+        """Generate next invoice number"""
+        # Concurrency-safe: nextval never hands out the same number twice
+        # (see migrations/create_invoice_number_seq.sql)
+        next_num = self.db.execute(_NEXT_INVOICE_NUMBER).scalar()
 
         # Format with leading zeros
         num_str = str(next_num).zfill(settings.INVOICE_NUMBER_LENGTH)
@@ -64,26 +218,23 @@ class InvoiceRepository:
         apply_sst: Optional[bool] = None,
     ) -> InvoiceNew:
         """Create a new invoice"""
-        bubble_id = f"inv_{secrets.token_hex(8)}"
-
         if not invoice_number:
             invoice_number = self._generate_invoice_number()
 
         if not invoice_date:
-            invoice_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            invoice_date = _today_str()
 
         # Find default template if none provided
         if not template_id:
-            default_template = self.db.query(InvoiceTemplate).filter(
-                InvoiceTemplate.is_default == True,
-                InvoiceTemplate.active == True
-            ).first()
-            if default_template:
-                template_id = default_template.bubble_id
+            template_id = self._get_default_template_id()
+
+        # SST (default off; on if the template requires it, or overridden by apply_sst)
+        sst_rate = Decimal(0)
+        if apply_sst is True or (apply_sst is None and template_id and self._get_template_apply_sst(template_id)):
+            sst_rate = _to_decimal(settings.DEFAULT_SST_RATE)
 
         # Create invoice
         invoice = InvoiceNew(
-            bubble_id=bubble_id,
             template_id=template_id,
             customer_id=customer_id,
             customer_name_snapshot=customer_name_snapshot,
@@ -101,85 +252,84 @@ class InvoiceRepository:
             voucher_code=voucher_code,
             internal_notes=internal_notes,
             customer_notes=customer_notes,
-            sst_rate=Decimal(0), # Default SST off
+            sst_rate=sst_rate,
             created_by=created_by,
             linked_old_invoice=linked_old_invoice,
         )
 
-        # SST override logic (only if template explicitly requires it, or overridden by apply_sst)
-        if apply_sst is True:
-            invoice.sst_rate = Decimal(str(settings.DEFAULT_SST_RATE))
-        elif apply_sst is False:
-            invoice.sst_rate = Decimal(0)
-        elif template_id:
-            template = self.db.query(InvoiceTemplate).filter(InvoiceTemplate.bubble_id == template_id).first()
-            if template and template.apply_sst:
-                invoice.sst_rate = Decimal(str(settings.DEFAULT_SST_RATE))
-        
         self.db.add(invoice)
-        self.db.flush()  # Get the invoice ID
-
-        # Add items
-        if items:
-            for item_data in items:
-                item = InvoiceNewItem(
-                    bubble_id=f"item_{secrets.token_hex(8)}",
-                    invoice_id=bubble_id,
-                    product_id=item_data.get("product_id"),
-                    product_name_snapshot=item_data.get("product_name_snapshot"),
-                    description=item_data["description"],
-                    qty=Decimal(str(item_data["qty"])),
-                    unit_price=Decimal(str(item_data["unit_price"])),
-                    discount_percent=Decimal(str(item_data.get("discount_percent", 0))),
-                    total_price=Decimal(str(item_data["total_price"])),
-                    sort_order=item_data.get("sort_order", 0),
-                )
-                self.db.add(item)
+        self.db.flush()  # bubble_id is generated by the database and returned by the INSERT
+        bubble_id = invoice.bubble_id
+
+        # Add items (single batched INSERT)
+        item_rows = [
+            {
+                "invoice_id": bubble_id,
+                "product_id": item_data.get("product_id"),
+                "product_name_snapshot": item_data.get("product_name_snapshot"),
+                "description": item_data["description"],
+                "qty": _to_decimal(item_data["qty"]),
+                "unit_price": _to_decimal(item_data["unit_price"]),
+                "discount_percent": _to_decimal(item_data.get("discount_percent") or 0),
+                "total_price": _to_decimal(item_data["total_price"]),
+                "sort_order": item_data.get("sort_order", 0),
+            }
+            for item_data in items or []
+        ]
+        new_items = self._insert_items(item_rows)
 
         # Calculate totals
-        self._calculate_invoice_totals(invoice)
-        self.db.commit()
-        self.db.refresh(invoice)
-
-        # Audit log
-        self._create_audit_log("invoice_new", bubble_id, "create", created_by, None, invoice.to_dict())
+        self._calculate_invoice_totals(invoice, new_items)
 
-        return invoice
-
-    def _calculate_invoice_totals(self, invoice: InvoiceNew) -> None:
-        """Calculate invoice totals"""
-        # Get all items from session/relationship to ensure we see unflushed items
-        items = invoice.items
+        # Audit log (committed together with the invoice)
+        self._create_audit_log("invoice_new", bubble_id, "create", created_by, None, _column_values(invoice))
 
-        # If items list is empty, try querying as fallback
-        if not items:
-            items = self.db.query(InvoiceNewItem).filter(
-                InvoiceNewItem.invoice_id == invoice.bubble_id
-            ).all()
+        self.db.commit()
 
-        # Calculate base subtotal from items (including negative prices from discount/voucher items)
-        subtotal = sum(item.total_price for item in items) if items else Decimal(0)
-        invoice.subtotal = subtotal
+        return invoice
 
-        # Calculate discount amount from discount items (negative prices already in subtotal)
-        discount_items = [item for item in items if hasattr(item, 'item_type') and item.item_type == 'discount']
-        discount_from_items = sum(abs(item.total_price) for item in discount_items)
+    def _insert_items(self, rows: List[dict]) -> List[InvoiceNewItem]:
+        """Insert invoice items in one batched INSERT ... RETURNING"""
+        if not rows:
+            return []
+        return self.db.scalars(_INSERT_ITEMS, rows).all()
 
-        # Calculate voucher amount from voucher items (negative prices already in subtotal)
-        voucher_items = [item for item in items if hasattr(item, 'item_type') and item.item_type == 'voucher']
-        voucher_from_items = sum(abs(item.total_price) for item in voucher_items)
+    def _calculate_invoice_totals(self, invoice: InvoiceNew, items: Optional[List[InvoiceNewItem]] = None) -> None:
+        """Calculate invoice totals"""
+        if items is None:
+            # Relationship collection (loaded by the caller, or lazy-loaded once here)
+            items = invoice.items
+
+        # Single pass over items in integer cents:
+        # - subtotal includes negative prices from discount/voucher items
+        # - discount/voucher items are always stored negative (create_on_the_fly is the
+        #   only writer of those item types), so their amounts are the negated prices
+        subtotal = 0
+        discount_from_items = 0
+        voucher_from_items = 0
+        for item in items:
+            price = _to_cents(item.total_price)
+            subtotal += price
+            item_type = item.item_type
+            if item_type == 'discount':
+                discount_from_items -= price
+            elif item_type == 'voucher':
+                voucher_from_items -= price
+        invoice.subtotal = _from_cents(subtotal)
 
         # Update invoice fields to match item amounts (for reference)
-        invoice.discount_amount = discount_from_items
-        invoice.voucher_amount = voucher_from_items
+        invoice.discount_amount = _from_cents(discount_from_items)
+        invoice.voucher_amount = _from_cents(voucher_from_items)
 
         # Calculate SST (on subtotal, which already includes negative prices)
         # Note: If there are discount/voucher items, they're already negative in subtotal
-        taxable_amount = subtotal
-        invoice.sst_amount = taxable_amount * (invoice.sst_rate / Decimal(100)) if taxable_amount > 0 else Decimal(0)
+        # sst_rate is a percentage with 2 decimals, i.e. basis points once scaled by 100
+        sst_rate_bp = _to_cents(invoice.sst_rate or 0)
+        sst_amount = _div_round(subtotal * sst_rate_bp, 10000) if subtotal > 0 else 0
+        invoice.sst_amount = _from_cents(sst_amount)
 
         # Calculate total
-        invoice.total_amount = taxable_amount + invoice.sst_amount
+        invoice.total_amount = _from_cents(subtotal + sst_amount)
 
     def create_on_the_fly(
         self,
@@ -195,31 +345,56 @@ class InvoiceRepository:
         customer_address: Optional[str] = None,
         epp_fee_amount: Optional[Decimal] = None,
         epp_fee_description: Optional[str] = None,
-        created_by: Optional[str] = None
+        created_by: Optional[str] = None,
+        invoice_date: Optional[str] = None,
     ) -> InvoiceNew:
-        """Create an invoice on the fly based on a package and other parameters"""
+        """
+        Create an invoice on the fly based on a package and other parameters
+        Batch callers can pass invoice_date (e.g. _today_str()) computed once for the run
+        """
         
-        # 1. Fetch Package
-        package = self.db.query(Package).filter(Package.bubble_id == package_id).first()
+        # 1. Fetch Package (and the active voucher, if a code was given) in one round trip
+        # The template needs no query here - its id/apply_sst come from the template cache
+        if voucher_code:
+            row = self.db.execute(
+                select(Package, Voucher)
+                .outerjoin(Voucher, and_(Voucher.voucher_code == voucher_code, Voucher.active == True))
+                .where(Package.bubble_id == package_id)
+                .limit(1)
+            ).first()
+            package, voucher = row if row else (None, None)
+        else:
+            package = self.db.scalar(select(Package).where(Package.bubble_id == package_id).limit(1))
+            voucher = None
         if not package:
             raise ValueError(f"Package not found: {package_id}")
 
         # 2. Handle Customer
         customer_id = None
         if customer_name:
-            # Try to find existing customer by name and phone
-            customer = self.db.query(Customer).filter(Customer.name == customer_name).first()
-            if not customer:
-                customer_id_str = f"cust_{secrets.token_hex(4)}"
-                customer = Customer(
-                    customer_id=customer_id_str,
-                    name=customer_name,
-                    phone=customer_phone,
-                    address=customer_address,
-                    created_by=created_by
+            stmt = pg_insert(Customer).values(
+                customer_id=f"cust_{secrets.token_hex(4)}",
+                name=customer_name,
+                phone=customer_phone,
+                address=customer_address,
+                created_by=created_by,
+            )
+            if customer_phone is None:
+                # NULL phones never conflict on ix_customer_name_phone - reuse a customer
+                # with the same name instead (leading index column), as before the upsert
+                customer = self.db.scalar(
+                    select(Customer).where(func.lower(Customer.name) == func.lower(customer_name)).limit(1)
                 )
-                self.db.add(customer)
-                self.db.flush()
+                if customer is None:
+                    customer = self.db.scalars(stmt.returning(Customer)).one()
+            else:
+                # Find-or-create by (name, phone) in one atomic upsert (index: ix_customer_name_phone)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=_CUSTOMER_CONFLICT_TARGET,
+                    # No-op write of the conflicting value - DO NOTHING would return no row
+                    set_={"phone": stmt.excluded.phone},
+                ).returning(Customer)
+                customer = self.db.scalars(stmt).one()
             customer_id = customer.id
             cust_name_snapshot = customer.name
             cust_phone_snapshot = customer.phone
@@ -233,43 +408,32 @@ class InvoiceRepository:
 
         # 3. Handle Voucher
         voucher_amount = Decimal(0)
-        if voucher_code:
-            voucher = self.db.query(Voucher).filter(Voucher.voucher_code == voucher_code, Voucher.active == True).first()
-            if voucher:
-                if voucher.discount_amount:
-                    voucher_amount = voucher.discount_amount
-                elif voucher.discount_percent:
-                    # Will be calculated based on package price later if needed, 
-                    # but usually it's a fixed amount or applied to total.
-                    # For now, let's assume it's applied to the package price.
-                    voucher_amount = package.price * (Decimal(voucher.discount_percent) / Decimal(100))
+        if voucher:
+            if voucher.discount_amount:
+                voucher_amount = voucher.discount_amount
+            elif voucher.discount_percent:
+                # Will be calculated based on package price later if needed, 
+                # but usually it's a fixed amount or applied to total.
+                # For now, let's assume it's applied to the package price.
+                voucher_amount = package.price * (Decimal(voucher.discount_percent) / Decimal(100))
 
         # 4. Handle Template and SST
         if not template_id:
-            default_template = self.db.query(InvoiceTemplate).filter(
-                InvoiceTemplate.is_default == True,
-                InvoiceTemplate.active == True
-            ).first()
-            if default_template:
-                template_id = default_template.bubble_id
+            template_id = self._get_default_template_id()
 
         sst_rate = Decimal(0)
         if apply_sst:
-            sst_rate = Decimal(str(settings.DEFAULT_SST_RATE))
+            sst_rate = _to_decimal(settings.DEFAULT_SST_RATE)
             # If we have a template, check if it overrides SST rate
-            if template_id:
-                template = self.db.query(InvoiceTemplate).filter(InvoiceTemplate.bubble_id == template_id).first()
-                if template and not template.apply_sst:
-                    sst_rate = Decimal(0)
+            if template_id and self._get_template_apply_sst(template_id) is False:
+                sst_rate = Decimal(0)
         
         # 5. Create Invoice
-        bubble_id = f"inv_{secrets.token_hex(8)}"
         invoice_number = self._generate_invoice_number()
         
         invoice = InvoiceNew(
-            bubble_id=bubble_id,
             invoice_number=invoice_number,
-            invoice_date=datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+            invoice_date=invoice_date or _today_str(),
             customer_id=customer_id,
             customer_name_snapshot=cust_name_snapshot,
             customer_phone_snapshot=cust_phone_snapshot,
@@ -282,7 +446,6 @@ class InvoiceRepository:
             discount_percent=discount_percent,
             agent_markup=agent_markup,
             voucher_code=voucher_code,
-            voucher_amount=voucher_amount,
             sst_rate=sst_rate,
             status="draft",
             created_by=created_by,
@@ -292,23 +455,23 @@ class InvoiceRepository:
         )
 
         self.db.add(invoice)
-        self.db.flush()
+        self.db.flush()  # bubble_id is generated by the database and returned by the INSERT
+        bubble_id = invoice.bubble_id
 
         # 6. Add Items from Package
         # Package table does NOT have an items column - always create single item from invoice_desc and price
         # Add markup to the item
+        # All items are collected here and inserted in one batched INSERT below
         unit_price = (package.price or Decimal(0)) + agent_markup
-        item = InvoiceNewItem(
-            bubble_id=f"item_{secrets.token_hex(8)}",
-            invoice=invoice,  # Use relationship for immediate update
-            description=package.invoice_desc or (package.name if hasattr(package, 'name') else f"Package {package.bubble_id}") or "Package Item",
-            qty=Decimal(1),
-            unit_price=unit_price,
-            total_price=unit_price,
-            item_type="package",  # Mark as package item
-            sort_order=0
-        )
-        self.db.add(item)
+        item_rows = [{
+            "invoice_id": bubble_id,
+            "description": package.invoice_desc or (package.name if hasattr(package, 'name') else f"Package {package.bubble_id}") or "Package Item",
+            "qty": Decimal(1),
+            "unit_price": unit_price,
+            "total_price": unit_price,
+            "item_type": "package",  # Mark as package item
+            "sort_order": 0,
+        }]
 
         # 6b. Create Discount Items (if discount exists)
         # Create TWO separate discount items: one for fixed, one for percentage
@@ -317,85 +480,71 @@ class InvoiceRepository:
 
         # Create FIXED discount item separately
         if discount_fixed and discount_fixed > 0:
-            fixed_discount_item = InvoiceNewItem(
-                bubble_id=f"item_{secrets.token_hex(8)}",
-                invoice=invoice,  # Use relationship for immediate update
-                description=f"Discount (RM {discount_fixed})",
-                qty=Decimal(1),
-                unit_price=-discount_fixed,  # Negative price for discount
-                total_price=-discount_fixed,
-                item_type="discount",
-                sort_order=discount_sort_order
-            )
-            self.db.add(fixed_discount_item)
+            item_rows.append({
+                "invoice_id": bubble_id,
+                "description": f"Discount (RM {discount_fixed})",
+                "qty": Decimal(1),
+                "unit_price": -discount_fixed,  # Negative price for discount
+                "total_price": -discount_fixed,
+                "item_type": "discount",
+                "sort_order": discount_sort_order,
+            })
             discount_sort_order += 1
 
         # Create PERCENT discount item separately
         if discount_percent and discount_percent > 0:
             percent_amount = package.price * (discount_percent / Decimal(100))
-            percent_discount_item = InvoiceNewItem(
-                bubble_id=f"item_{secrets.token_hex(8)}",
-                invoice=invoice,  # Use relationship for immediate update
-                description=f"Discount ({discount_percent}%)",
-                qty=Decimal(1),
-                unit_price=-percent_amount,  # Negative price for discount
-                total_price=-percent_amount,
-                item_type="discount",
-                sort_order=discount_sort_order
-            )
-            self.db.add(percent_discount_item)
+            item_rows.append({
+                "invoice_id": bubble_id,
+                "description": f"Discount ({discount_percent}%)",
+                "qty": Decimal(1),
+                "unit_price": -percent_amount,  # Negative price for discount
+                "total_price": -percent_amount,
+                "item_type": "discount",
+                "sort_order": discount_sort_order,
+            })
             discount_sort_order += 1
 
         # 6c. Create Voucher Item (if voucher exists)
         # Voucher should be visible as invoice item with negative price
         if voucher_code and voucher_amount > 0:
-            voucher_item = InvoiceNewItem(
-                bubble_id=f"item_{secrets.token_hex(8)}",
-                invoice=invoice,  # Use relationship for immediate update
-                description=f"Voucher ({voucher_code})",
-                qty=Decimal(1),
-                unit_price=-voucher_amount,  # Negative price for voucher
-                total_price=-voucher_amount,
-                item_type="voucher",
-                sort_order=101  # Show after discount
-            )
-            self.db.add(voucher_item)
+            item_rows.append({
+                "invoice_id": bubble_id,
+                "description": f"Voucher ({voucher_code})",
+                "qty": Decimal(1),
+                "unit_price": -voucher_amount,  # Negative price for voucher
+                "total_price": -voucher_amount,
+                "item_type": "voucher",
+                "sort_order": 101,  # Show after discount
+            })
 
         # 6d. Create EPP Fee Item (if EPP fees exist)
         # EPP fee should be visible as invoice item with positive price
         if epp_fee_amount and epp_fee_amount > 0 and epp_fee_description:
             # Ensure epp_fee_amount is Decimal
-            epp_fee_decimal = Decimal(str(epp_fee_amount)) if not isinstance(epp_fee_amount, Decimal) else epp_fee_amount
-            epp_fee_item = InvoiceNewItem(
-                bubble_id=f"item_{secrets.token_hex(8)}",
-                invoice=invoice,  # Use relationship for immediate update
-                description=f"Bank Processing Fee ({epp_fee_description})",
-                qty=Decimal(1),
-                unit_price=epp_fee_decimal,
-                total_price=epp_fee_decimal,
-                item_type="epp_fee",  # Mark as EPP fee item
-                sort_order=200  # Show after voucher
-            )
-            self.db.add(epp_fee_item)
+            epp_fee_decimal = _to_decimal(epp_fee_amount)
+            item_rows.append({
+                "invoice_id": bubble_id,
+                "description": f"Bank Processing Fee ({epp_fee_description})",
+                "qty": Decimal(1),
+                "unit_price": epp_fee_decimal,
+                "total_price": epp_fee_decimal,
+                "item_type": "epp_fee",  # Mark as EPP fee item
+                "sort_order": 200,  # Show after voucher
+            })
+
+        new_items = self._insert_items(item_rows)
 
         # Note: Markup is NOT visible as item (user requirement: "invisible to client")
         # Markup is already added to package price above
 
         # 7. Finalize
-        self._calculate_invoice_totals(invoice)
+        self._calculate_invoice_totals(invoice, new_items)
+
+        # Audit log (committed together with the invoice)
+        self._create_audit_log("invoice_new", bubble_id, "create_on_the_fly", created_by, None, _column_values(invoice))
+
         self.db.commit()
-        self.db.refresh(invoice)
-        
-        # Audit log
-        new_values = {c.name: getattr(invoice, c.name) for c in invoice.__table__.columns}
-        # Convert Decimals to float for JSON serialization in audit log
-        for k, v in new_values.items():
-            if isinstance(v, Decimal):
-                new_values[k] = float(v)
-            elif isinstance(v, datetime):
-                new_values[k] = v.isoformat()
-        
-        self._create_audit_log("invoice_new", bubble_id, "create_on_the_fly", created_by, None, json.dumps(new_values))
 
         return invoice
 
@@ -403,32 +552,43 @@ class InvoiceRepository:
         """Get invoice by ID"""
         return self.db.query(InvoiceNew).filter(InvoiceNew.bubble_id == bubble_id).first()
 
+    def _get_with_items(self, bubble_id: str) -> Optional[InvoiceNew]:
+        """Get invoice by ID with items loaded in the same call"""
+        return self.db.query(InvoiceNew).options(
+            selectinload(InvoiceNew.items)
+        ).filter(InvoiceNew.bubble_id == bubble_id).first()
+
+    def _get_item_with_invoice(self, item_id: str) -> Optional[InvoiceNewItem]:
+        """Get invoice item with its invoice and the invoice's items loaded"""
+        return self.db.query(InvoiceNewItem).options(
+            joinedload(InvoiceNewItem.invoice).selectinload(InvoiceNew.items)
+        ).filter(InvoiceNewItem.bubble_id == item_id).first()
+
     def get_by_number(self, invoice_number: str) -> Optional[InvoiceNew]:
         """Get invoice by invoice number"""
         return self.db.query(InvoiceNew).filter(InvoiceNew.invoice_number == invoice_number).first()
 
     def get_template(self, template_id: str) -> Optional[dict]:
-        """Get template data by ID"""
-        from sqlalchemy import text
-        result = self.db.execute(
-            text("SELECT * FROM invoice_template WHERE bubble_id = :id"),
-            {"id": template_id}
-        ).first()
-        return result._asdict() if result else None
+        """Get template data by ID (cached per process; callers get their own copy)"""
+        key = f"data:{template_id}"
+        data = _template_cache_get(key)
+        if data is _MISSING:
+            row = self.db.execute(_TEMPLATE_BY_ID, {"id": template_id}).mappings().first()
+            data = dict(row) if row else None
+            _template_cache_set(key, data)
+        return dict(data) if data else None
 
     def get_default_template_data(self) -> Optional[dict]:
-        """Get default template data"""
-        from sqlalchemy import text
-        result = self.db.execute(
-            text("SELECT * FROM invoice_template WHERE is_default = True AND active = True LIMIT 1")
-        ).first()
-        if not result:
-            # Fallback to any active template if no default set
-            result = self.db.execute(
-                text("SELECT * FROM invoice_template WHERE active = True LIMIT 1")
-            ).first()
-        
-        return result._asdict() if result else None
+        """Get default template data (cached per process; callers get their own copy)"""
+        data = _template_cache_get(_DEFAULT_TEMPLATE_DATA_KEY)
+        if data is _MISSING:
+            row = self.db.execute(_DEFAULT_TEMPLATE).mappings().first()
+            if not row:
+                # Fallback to any active template if no default set
+                row = self.db.execute(_ANY_ACTIVE_TEMPLATE).mappings().first()
+            data = dict(row) if row else None
+            _template_cache_set(_DEFAULT_TEMPLATE_DATA_KEY, data)
+        return dict(data) if data else None
 
     def get_by_share_token(self, share_token: str) -> Optional[InvoiceNew]:
         """Get invoice by share token"""
@@ -473,10 +633,23 @@ class InvoiceRepository:
         if date_to:
             query = query.filter(InvoiceNew.invoice_date <= date_to)
 
-        query = query.order_by(InvoiceNew.invoice_date.desc(), InvoiceNew.created_at.desc())
-
-        total = query.count()
-        invoices = query.offset(skip).limit(limit).all()
+        # List pages serialize invoice headers only - items/payments are not loaded
+        # (raiseload catches any accidental lazy load).
+        # The total comes back on every row (COUNT(*) OVER ()) - no separate COUNT query
+        rows = query.add_columns(func.count().over().label("total")).options(
+            raiseload('*'),
+        ).order_by(
+            InvoiceNew.invoice_date.desc(), InvoiceNew.created_at.desc()
+        ).offset(skip).limit(limit).all()
+
+        if rows:
+            total = rows[0].total
+        elif skip:
+            # Page past the end - no row to carry the window count
+            total = self.db.scalar(select(func.count()).select_from(query.subquery()))
+        else:
+            total = 0
+        invoices = [row[0] for row in rows]
         return invoices, total
 
     def update(
@@ -485,11 +658,12 @@ class InvoiceRepository:
         **kwargs
     ) -> Optional[InvoiceNew]:
         """Update invoice"""
-        invoice = self.get_by_id(bubble_id)
+        # Items are needed to recalculate totals
+        invoice = self._get_with_items(bubble_id)
         if not invoice:
             return None
 
-        old_data = invoice.to_dict()
+        old_data = _column_values(invoice)
 
         for key, value in kwargs.items():
             if hasattr(invoice, key) and value is not None:
@@ -500,11 +674,10 @@ class InvoiceRepository:
         # Recalculate totals
         self._calculate_invoice_totals(invoice)
 
-        self.db.commit()
-        self.db.refresh(invoice)
+        # Audit log (committed together with the update)
+        self._create_audit_log("invoice_new", bubble_id, "update", invoice.created_by, old_data, _column_values(invoice))
 
-        # Audit log
-        self._create_audit_log("invoice_new", bubble_id, "update", invoice.created_by, old_data, invoice.to_dict())
+        self.db.commit()
 
         return invoice
 
@@ -514,18 +687,16 @@ class InvoiceRepository:
         if not invoice:
             return False
 
-        old_data = invoice.to_dict()
-
-        # Delete related items and payments (cascade)
-        self.db.query(InvoiceNewItem).filter(InvoiceNewItem.invoice_id == bubble_id).delete()
-        self.db.query(InvoicePaymentNew).filter(InvoicePaymentNew.invoice_id == bubble_id).delete()
+        old_data = _column_values(invoice)
 
+        # Items and payments are removed by ON DELETE CASCADE
         self.db.delete(invoice)
-        self.db.commit()
 
-        # Audit log
+        # Audit log (committed together with the delete)
         self._create_audit_log("invoice_new", bubble_id, "delete", invoice.created_by, old_data, None)
 
+        self.db.commit()
+
         return True
 
     def add_item(
@@ -540,8 +711,11 @@ class InvoiceRepository:
         sort_order: int = 0,
     ) -> InvoiceNewItem:
         """Add item to invoice"""
+        # Load invoice and its items together - the new item is appended to the
+        # loaded collection so totals need no re-query
+        invoice = self._get_with_items(invoice_id)
+
         item = InvoiceNewItem(
-            bubble_id=f"item_{secrets.token_hex(8)}",
             invoice_id=invoice_id,
             product_id=product_id,
             product_name_snapshot=product_name_snapshot,
@@ -549,18 +723,17 @@ class InvoiceRepository:
             qty=qty,
             unit_price=unit_price,
             discount_percent=discount_percent,
-            total_price=qty * unit_price * (1 - discount_percent / Decimal(100)),
+            total_price=line_total(qty, unit_price, discount_percent),
             sort_order=sort_order,
         )
         self.db.add(item)
 
         # Recalculate invoice totals
-        invoice = self.get_by_id(invoice_id)
         if invoice:
-            self._calculate_invoice_totals(invoice)
+            invoice.items.append(item)
+            self._calculate_invoice_totals(invoice, invoice.items)
 
         self.db.commit()
-        self.db.refresh(item)
         return item
 
     def update_item(
@@ -569,9 +742,7 @@ class InvoiceRepository:
         **kwargs
     ) -> Optional[InvoiceNewItem]:
         """Update invoice item"""
-        item = self.db.query(InvoiceNewItem).filter(
-            InvoiceNewItem.bubble_id == item_id
-        ).first()
+        item = self._get_item_with_invoice(item_id)
 
         if not item:
             return None
@@ -581,12 +752,12 @@ class InvoiceRepository:
                 setattr(item, key, value)
 
         # Recalculate total price
-        item.total_price = item.qty * item.unit_price * (1 - item.discount_percent / Decimal(100))
+        item.total_price = line_total(item.qty, item.unit_price, item.discount_percent)
 
         # Recalculate invoice totals
-        invoice = self.get_by_id(item.invoice_id)
+        invoice = item.invoice
         if invoice:
-            self._calculate_invoice_totals(invoice)
+            self._calculate_invoice_totals(invoice, invoice.items)
 
         self.db.commit()
         self.db.refresh(item)
@@ -594,20 +765,18 @@ class InvoiceRepository:
 
     def delete_item(self, item_id: str) -> bool:
         """Delete invoice item"""
-        item = self.db.query(InvoiceNewItem).filter(
-            InvoiceNewItem.bubble_id == item_id
-        ).first()
+        item = self._get_item_with_invoice(item_id)
 
         if not item:
             return False
 
-        invoice_id = item.invoice_id
+        invoice = item.invoice
         self.db.delete(item)
 
         # Recalculate invoice totals
-        invoice = self.get_by_id(invoice_id)
         if invoice:
-            self._calculate_invoice_totals(invoice)
+            invoice.items.remove(item)
+            self._calculate_invoice_totals(invoice, invoice.items)
 
         self.db.commit()
         return True
@@ -688,28 +857,14 @@ class InvoiceRepository:
             invoice.share_access_count += 1
             self.db.commit()
 
-    def get_unmigrated_old_invoices(self, limit: int = 100) -> List[dict]:
-        """Get old invoices that haven't been migrated yet"""
-        # Query from the old invoice table using raw SQL
-        query = """
-            SELECT i.*, array_agg(jsonb_build_object(
-                'bubble_id', ii.bubble_id,
-                'description', ii.description,
-                'qty', ii.qty,
-                'unit_price', ii.unit_price,
-                'amount', ii.amount
-            )) as items
-            FROM invoice i
-            LEFT JOIN invoice_item ii ON i.bubble_id = ii.linked_invoice
-            WHERE NOT EXISTS (
-                SELECT 1 FROM invoice_new inv
-                WHERE inv.linked_old_invoice = i.bubble_id
-            )
-            GROUP BY i.bubble_id
-            LIMIT :limit
+    def get_unmigrated_old_invoices(self, limit: int = 100, cursor: Optional[str] = None) -> List[dict]:
+        """
+        Get old invoices that haven't been migrated yet
+        Keyset-paginated by bubble_id: pass the last bubble_id of the previous page as cursor
         """
-        result = self.db.execute(query, {"limit": limit})
-        return [dict(row) for row in result]
+        return self.db.execute(
+            _UNMIGRATED_OLD_INVOICES, {"cursor": cursor or "", "limit": limit}
+        ).mappings().all()
 
     def _create_audit_log(
         self,
@@ -721,18 +876,17 @@ class InvoiceRepository:
         new_values: Optional[dict],
         ip_address: Optional[str] = None,
     ) -> None:
-        """Create an audit log entry"""
+        """Create an audit log entry (flushed with the caller's commit)"""
         log = AuditLog(
             entity_type=entity_type,
             entity_id=entity_id,
             action=action,
             user_id=user_id,
-            old_values=json.dumps(old_values) if old_values else None,
-            new_values=json.dumps(new_values) if new_values else None,
+            old_values=_dump_audit_values(old_values) if old_values else None,
+            new_values=_dump_audit_values(new_values) if new_values else None,
             ip_address=ip_address,
         )
         self.db.add(log)
-        self.db.commit()
 
 
 # Monkey patch to_dict method for SQLAlchemy models
@@ -1,14 +1,58 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text, and_, or_
-from typing import Optional, List
+from sqlalchemy import text, and_, or_, func, insert, update, delete
+from typing import Optional, List, Iterator, NamedTuple
 from datetime import datetime, timezone
 from decimal import Decimal
+import os
 import time
-import random
 from app.models.package import Package
 from app.models.package_item import PackageItem
 from app.models.product import Product
 from app.models.brand import Brand
+from app.utils.pagination import keyset_page, count_rows
+
+
+class BrandRow(NamedTuple):
+    """Brand list row - plain columns, no ORM instance/identity-map bookkeeping"""
+    id: int
+    bubble_id: Optional[str]
+    name: Optional[str]
+    logo: Optional[str]
+    created_by: Optional[str]
+    created_date: Optional[datetime]
+    modified_date: Optional[datetime]
+
+
+_BRAND_ROW_COLUMNS = tuple(getattr(Brand, name) for name in BrandRow._fields)
+
+
+# Items (with product/brand names) for many packages in one query, joined through
+# package_item_link (kept in step with package.linked_package_item by triggers)
+_PACKAGE_ITEMS_QUERY = text("""
+    SELECT
+        link.package_bubble_id AS package_id,
+        pi.*,
+        p.name AS product_name,
+        p.linked_brand,
+        b.name AS brand_name
+    FROM package_item_link link
+    JOIN package_item pi ON pi.bubble_id = link.item_bubble_id
+    LEFT JOIN product p ON p.bubble_id = pi.product
+    LEFT JOIN brand b ON b.bubble_id = p.linked_brand
+    WHERE link.package_bubble_id = ANY(:package_ids)
+    ORDER BY pi.sort NULLS LAST, link.sort_order
+""")
+
+# Import file column -> package column updated by bulk_update_from_import
+_IMPORT_COLUMNS = {
+    "price": "price",
+    "invoice_description": "invoice_desc",
+    "internal_description": "description",
+}
+
+# INSERT ... RETURNING in one round trip (server defaults come back with the row)
+_INSERT_PACKAGE = insert(Package).returning(Package)
+_INSERT_PACKAGE_ITEM = insert(PackageItem).returning(PackageItem)
 
 
 class PackageRepository:
@@ -16,20 +60,28 @@ class PackageRepository:
         self.db = db
 
     def _generate_bubble_id(self) -> str:
-        """Generate bubble_id in format: timestampxrandom"""
-        timestamp = int(time.time() * 1000)
-        random_part = random.randint(100000000000000000, 999999999999999999)
-        return f"{timestamp}x{random_part}"
+        """Generate one bubble_id - see _generate_bubble_ids"""
+        return self._generate_bubble_ids(1)[0]
 
-    def list_packages(
+    def _generate_bubble_ids(self, n: int) -> List[str]:
+        """
+        Generate n Bubble-style bubble_ids: "<ms timestamp>x<18 random digits>"
+        Same layout as the ids synced from Bubble; the clock and os.urandom are each read once for the whole batch
+        """
+        prefix = f"{time.time_ns() // 1_000_000}x"
+        raw = os.urandom(8 * n)
+        return [
+            f"{prefix}{100000000000000000 + int.from_bytes(raw[i:i + 8], 'big') % 900000000000000000}"
+            for i in range(0, 8 * n, 8)
+        ]
+
+    def _build_package_query(
         self,
-        skip: int = 0,
-        limit: int = 100,
         active_only: Optional[bool] = None,
         package_type: Optional[str] = None,
-        search: Optional[str] = None
-    ) -> tuple[List[Package], int]:
-        """List packages with filters"""
+        search: Optional[str] = None,
+    ):
+        """Package query with list filters applied. Returns (query, filtered)"""
         query = self.db.query(Package)
         
         if active_only is not None:
@@ -39,6 +91,7 @@ class PackageRepository:
             query = query.filter(Package.type == package_type)
         
         if search:
+            # Substring match served by the pg_trgm GIN indexes (*_trgm)
             search_filter = or_(
                 Package.name.ilike(f"%{search}%"),
                 Package.invoice_desc.ilike(f"%{search}%"),
@@ -46,44 +99,78 @@ class PackageRepository:
             )
             query = query.filter(search_filter)
         
-        total = query.count()
-        packages = query.order_by(Package.created_date.desc().nullslast(), Package.id.desc()).offset(skip).limit(limit).all()
+        filtered = active_only is not None or bool(package_type) or bool(search)
+        return query, filtered
+
+    def list_packages(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        active_only: Optional[bool] = None,
+        package_type: Optional[str] = None,
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> tuple[List[Package], Optional[int], Optional[str]]:
+        """
+        List packages with filters
+        Keyset-paginated on (created_date, id) DESC: pass the previous page's next_cursor as cursor
+        Returns (packages, total, next_cursor) - total is only computed when include_total
+        (estimated from table statistics when no filter is applied)
+        """
+        query, filtered = self._build_package_query(active_only, package_type, search)
+        total = count_rows(self.db, query, "package", filtered) if include_total else None
+        packages, next_cursor = keyset_page(
+            query, (Package.created_date, Package.id), limit, cursor=cursor, skip=skip
+        )
         
-        return packages, total
+        return packages, total, next_cursor
+
+    def iter_packages(
+        self,
+        active_only: Optional[bool] = None,
+        package_type: Optional[str] = None,
+        search: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> Iterator[Package]:
+        """
+        Stream all matching packages (same filters as list_packages, newest first)
+        Rows are fetched batch_size at a time from a server-side cursor, so memory stays bounded
+        """
+        query, _ = self._build_package_query(active_only, package_type, search)
+        query = query.order_by(Package.created_date.desc().nullslast(), Package.id.desc())
+        yield from query.yield_per(batch_size)
 
     def get_package(self, bubble_id: str) -> Optional[Package]:
         """Get package by bubble_id"""
         return self.db.query(Package).filter(Package.bubble_id == bubble_id).first()
 
+    def get_items_for_packages(self, packages: List[Package]) -> dict:
+        """
+        Get items for many packages in one query (no per-package round trip)
+        Returns {package bubble_id: [item row, ...]} - packages without items map to []
+        Items are read-only RowMappings (no per-row dict copy)
+        """
+        items_by_package = {package.bubble_id: [] for package in packages}
+        package_ids = [package.bubble_id for package in packages if package.linked_package_item]
+        if not package_ids:
+            return items_by_package
+
+        rows = self.db.execute(_PACKAGE_ITEMS_QUERY, {"package_ids": package_ids})
+        for row in rows.mappings():
+            items_by_package[row["package_id"]].append(row)
+        return items_by_package
+
     def get_package_with_items(self, bubble_id: str) -> Optional[dict]:
         """Get package with related items"""
         package = self.get_package(bubble_id)
         if not package:
             return None
         
-        result = {
+        return {
             "package": package,
-            "items": []
+            "items": self.get_items_for_packages([package])[package.bubble_id],
         }
-        
-        # Get package items
-        if package.linked_package_item:
-            items_query = text("""
-                SELECT 
-                    pi.*,
-                    p.name as product_name,
-                    p.linked_brand,
-                    b.name as brand_name
-                FROM package_item pi
-                LEFT JOIN product p ON p.bubble_id = pi.product
-                LEFT JOIN brand b ON b.bubble_id = p.linked_brand
-                WHERE pi.bubble_id = ANY(:item_ids)
-                ORDER BY pi.sort NULLS LAST, pi.created_date
-            """)
-            items = self.db.execute(items_query, {"item_ids": package.linked_package_item}).fetchall()
-            result["items"] = [dict(item) for item in items]
-        
-        return result
 
     def create_package(
         self,
@@ -100,37 +187,40 @@ class PackageRepository:
         need_approval: bool = False,
         password: Optional[str] = None,
         linked_package_items: Optional[List[str]] = None,
-        created_by: Optional[str] = None
+        created_by: Optional[str] = None,
+        items: Optional[List[dict]] = None,
     ) -> Package:
-        """Create a new package"""
+        """
+        Create a new package
+        items (product_id, qty, total_cost, sort) are created in one batched INSERT
+        and linked to the package in the same transaction
+        """
         bubble_id = self._generate_bubble_id()
         now = datetime.now(timezone.utc)
-        
-        package = Package(
-            bubble_id=bubble_id,
-            name=name,
-            price=price,
-            panel=panel,
-            panel_qty=panel_qty,
-            type=package_type,
-            active=active,
-            invoice_desc=invoice_desc,
-            description=description,
-            max_discount=max_discount,
-            special=special,
-            need_approval=need_approval,
-            password=password,
-            linked_package_item=linked_package_items or [],
-            created_by=created_by,
-            created_date=now,
-            modified_date=now
-        )
-        
-        self.db.add(package)
-        self.db.commit()
-        self.db.refresh(package)
-        
-        return package
+
+        linked_package_items = list(linked_package_items or [])
+        if items:
+            linked_package_items += self.bulk_create_package_items(items, created_by)
+        
+        return self.db.execute(_INSERT_PACKAGE, {
+            "bubble_id": bubble_id,
+            "name": name,
+            "price": price,
+            "panel": panel,
+            "panel_qty": panel_qty,
+            "type": package_type,
+            "active": active,
+            "invoice_desc": invoice_desc,
+            "description": description,
+            "max_discount": max_discount,
+            "special": special,
+            "need_approval": need_approval,
+            "password": password,
+            "linked_package_item": linked_package_items,
+            "created_by": created_by,
+            "created_date": now,
+            "modified_date": now,
+        }).scalar_one()
 
     def update_package(
         self,
@@ -149,55 +239,40 @@ class PackageRepository:
         password: Optional[str] = None,
         linked_package_items: Optional[List[str]] = None
     ) -> Optional[Package]:
-        """Update package"""
-        package = self.get_package(bubble_id)
-        if not package:
-            return None
-        
-        if name is not None:
-            package.name = name
-        if price is not None:
-            package.price = price
-        if panel is not None:
-            package.panel = panel
-        if panel_qty is not None:
-            package.panel_qty = panel_qty
-        if package_type is not None:
-            package.type = package_type
-        if active is not None:
-            package.active = active
-        if invoice_desc is not None:
-            package.invoice_desc = invoice_desc
-        if description is not None:
-            package.description = description
-        if max_discount is not None:
-            package.max_discount = max_discount
-        if special is not None:
-            package.special = special
-        if need_approval is not None:
-            package.need_approval = need_approval
-        if password is not None:
-            package.password = password
+        """Update package (UPDATE ... RETURNING - no load before the write)"""
+        values = {
+            "name": name,
+            "price": price,
+            "panel": panel,
+            "panel_qty": panel_qty,
+            "type": package_type,
+            "active": active,
+            "invoice_desc": invoice_desc,
+            "description": description,
+            "max_discount": max_discount,
+            "special": special,
+            "need_approval": need_approval,
+            "password": password,
+        }
+        values = {key: value for key, value in values.items() if value is not None}
         if linked_package_items is not None:
             # Ensure it's a list, not None
-            package.linked_package_item = linked_package_items if isinstance(linked_package_items, list) else []
-        
-        package.modified_date = datetime.now(timezone.utc)
-        
-        self.db.commit()
-        self.db.refresh(package)
-        
-        return package
+            values["linked_package_item"] = linked_package_items if isinstance(linked_package_items, list) else []
+        if not values:
+            # Nothing to change - return the row untouched
+            return self.get_package(bubble_id)
+        values["modified_date"] = datetime.now(timezone.utc)
+
+        return self.db.execute(
+            update(Package).where(Package.bubble_id == bubble_id).values(**values).returning(Package)
+        ).scalar_one_or_none()
 
     def delete_package(self, bubble_id: str) -> bool:
         """Delete package"""
-        package = self.get_package(bubble_id)
-        if not package:
-            return False
-        
-        self.db.delete(package)
-        self.db.commit()
-        return True
+        deleted_id = self.db.execute(
+            delete(Package).where(Package.bubble_id == bubble_id).returning(Package.id)
+        ).scalar_one_or_none()
+        return deleted_id is not None
 
     # Package Item methods
     def get_package_item(self, bubble_id: str) -> Optional[PackageItem]:
@@ -216,22 +291,46 @@ class PackageRepository:
         bubble_id = self._generate_bubble_id()
         now = datetime.now(timezone.utc)
         
-        item = PackageItem(
-            bubble_id=bubble_id,
-            product=product_id,
-            qty=qty,
-            total_cost=total_cost or 0,
-            sort=sort or 0,
-            created_by=created_by,
-            created_date=now,
-            modified_date=now
-        )
-        
-        self.db.add(item)
-        self.db.commit()
-        self.db.refresh(item)
-        
-        return item
+        return self.db.execute(_INSERT_PACKAGE_ITEM, {
+            "bubble_id": bubble_id,
+            "product": product_id,
+            "qty": qty,
+            "total_cost": total_cost or 0,
+            "sort": sort or 0,
+            "created_by": created_by,
+            "created_date": now,
+            "modified_date": now,
+        }).scalar_one()
+
+    def bulk_create_package_items(
+        self,
+        items: List[dict],
+        created_by: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Create many package items in one batched INSERT (instead of one round trip each)
+        Each dict takes product_id, qty and optional total_cost/sort
+        Returns the new bubble_ids in input order
+        """
+        if not items:
+            return []
+
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "bubble_id": bubble_id,
+                "product": item["product_id"],
+                "qty": item["qty"],
+                "total_cost": item.get("total_cost") or 0,
+                "sort": item.get("sort") or 0,
+                "created_by": created_by,
+                "created_date": now,
+                "modified_date": now,
+            }
+            for bubble_id, item in zip(self._generate_bubble_ids(len(items)), items)
+        ]
+        self.db.execute(insert(PackageItem), rows)
+        return [row["bubble_id"] for row in rows]
 
     def update_package_item(
         self,
@@ -241,36 +340,24 @@ class PackageRepository:
         total_cost: Optional[int] = None,
         sort: Optional[int] = None
     ) -> Optional[PackageItem]:
-        """Update package item"""
-        item = self.get_package_item(bubble_id)
-        if not item:
-            return None
-        
-        if product_id is not None:
-            item.product = product_id
-        if qty is not None:
-            item.qty = qty
-        if total_cost is not None:
-            item.total_cost = total_cost
-        if sort is not None:
-            item.sort = sort
-        
-        item.modified_date = datetime.now(timezone.utc)
-        
-        self.db.commit()
-        self.db.refresh(item)
-        
-        return item
+        """Update package item (UPDATE ... RETURNING - no load before the write)"""
+        values = {"product": product_id, "qty": qty, "total_cost": total_cost, "sort": sort}
+        values = {key: value for key, value in values.items() if value is not None}
+        if not values:
+            # Nothing to change - return the row untouched
+            return self.get_package_item(bubble_id)
+        values["modified_date"] = datetime.now(timezone.utc)
+
+        return self.db.execute(
+            update(PackageItem).where(PackageItem.bubble_id == bubble_id).values(**values).returning(PackageItem)
+        ).scalar_one_or_none()
 
     def delete_package_item(self, bubble_id: str) -> bool:
         """Delete package item"""
-        item = self.get_package_item(bubble_id)
-        if not item:
-            return False
-        
-        self.db.delete(item)
-        self.db.commit()
-        return True
+        deleted_id = self.db.execute(
+            delete(PackageItem).where(PackageItem.bubble_id == bubble_id).returning(PackageItem.id)
+        ).scalar_one_or_none()
+        return deleted_id is not None
 
     # Product methods
     def list_products(
@@ -279,9 +366,14 @@ class PackageRepository:
         limit: int = 100,
         active_only: bool = True,
         search: Optional[str] = None,
-        brand_id: Optional[str] = None
-    ) -> tuple[List[Product], int]:
-        """List products with filters"""
+        brand_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> tuple[List[Product], Optional[int], Optional[str]]:
+        """
+        List products with filters
+        Keyset-paginated on (created_date, id) DESC - see list_packages
+        """
         query = self.db.query(Product)
         
         if active_only:
@@ -291,17 +383,16 @@ class PackageRepository:
             query = query.filter(Product.linked_brand == brand_id)
         
         if search:
-            search_filter = or_(
-                Product.name.ilike(f"%{search}%"),
-                Product.description.ilike(f"%{search}%"),
-                Product.label.ilike(f"%{search}%")
-            )
-            query = query.filter(search_filter)
+            # One full-text match on the generated search_vec column (GIN index ix_product_search)
+            query = query.filter(Product.search_vec.op("@@")(func.websearch_to_tsquery("simple", search)))
         
-        total = query.count()
-        products = query.order_by(Product.created_date.desc().nullslast(), Product.id.desc()).offset(skip).limit(limit).all()
+        filtered = active_only or bool(brand_id) or bool(search)
+        total = count_rows(self.db, query, "product", filtered) if include_total else None
+        products, next_cursor = keyset_page(
+            query, (Product.created_date, Product.id), limit, cursor=cursor, skip=skip
+        )
         
-        return products, total
+        return products, total, next_cursor
 
     def get_product(self, bubble_id: str) -> Optional[Product]:
         """Get product by bubble_id"""
@@ -312,44 +403,51 @@ class PackageRepository:
         self,
         skip: int = 0,
         limit: int = 100,
-        search: Optional[str] = None
-    ) -> tuple[List[Brand], int]:
-        """List brands with filters"""
-        query = self.db.query(Brand)
+        search: Optional[str] = None,
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> tuple[List[BrandRow], Optional[int], Optional[str]]:
+        """
+        List brands with filters
+        Keyset-paginated on (created_date, id) DESC - see list_packages
+        Selects the response columns only and returns BrandRow tuples
+        """
+        query = self.db.query(*_BRAND_ROW_COLUMNS)
         
         if search:
+            # Substring match served by the pg_trgm GIN indexes (*_trgm)
             query = query.filter(Brand.name.ilike(f"%{search}%"))
         
-        total = query.count()
-        brands = query.order_by(Brand.created_date.desc().nullslast(), Brand.id.desc()).offset(skip).limit(limit).all()
+        total = count_rows(self.db, query, "brand", bool(search)) if include_total else None
+        rows, next_cursor = keyset_page(
+            query, (Brand.created_date, Brand.id), limit, cursor=cursor, skip=skip
+        )
         
-        return brands, total
+        return [BrandRow(*row) for row in rows], total, next_cursor
 
     def get_brand(self, bubble_id: str) -> Optional[Brand]:
         """Get brand by bubble_id"""
         return self.db.query(Brand).filter(Brand.bubble_id == bubble_id).first()
 
+    def get_brand_names(self, bubble_ids: List[str]) -> dict:
+        """Get {brand bubble_id: name} for many brands in one query"""
+        ids = {bubble_id for bubble_id in bubble_ids if bubble_id}
+        if not ids:
+            return {}
+        rows = self.db.query(Brand.bubble_id, Brand.name).filter(Brand.bubble_id.in_(ids))
+        return {bubble_id: name for bubble_id, name in rows}
+
     def get_export_data(self) -> List[dict]:
         """Get all packages with a summary of their items for export"""
         packages = self.db.query(Package).order_by(Package.name).all()
+        items_by_package = self.get_items_for_packages(packages)
         export_data = []
 
         for pkg in packages:
-            items_summary = ""
-            if pkg.linked_package_item:
-                items_query = text("""
-                    SELECT 
-                        pi.qty,
-                        p.name as product_name,
-                        b.name as brand_name
-                    FROM package_item pi
-                    LEFT JOIN product p ON p.bubble_id = pi.product
-                    LEFT JOIN brand b ON b.bubble_id = p.linked_brand
-                    WHERE pi.bubble_id = ANY(:item_ids)
-                    ORDER BY pi.sort NULLS LAST, pi.created_date
-                """)
-                items = self.db.execute(items_query, {"item_ids": pkg.linked_package_item}).fetchall()
-                items_summary = ", ".join([f"{item.brand_name or ''} {item.product_name} x{item.qty}" for item in items])
+            items_summary = ", ".join(
+                f"{item['brand_name'] or ''} {item['product_name']} x{item['qty']}"
+                for item in items_by_package[pkg.bubble_id]
+            )
 
             export_data.append({
                 "package_id": pkg.bubble_id,
@@ -363,7 +461,10 @@ class PackageRepository:
         return export_data
 
     def bulk_update_from_import(self, import_data: List[dict]) -> dict:
-        """Update multiple packages from import data with verification"""
+        """
+        Update multiple packages from import data with verification
+        One SELECT for all referenced packages, then one batched UPDATE of only the imported columns
+        """
         results = {
             "updated": 0,
             "failed": 0,
@@ -371,39 +472,39 @@ class PackageRepository:
             "warnings": []
         }
 
+        bubble_ids = {row.get("package_id") for row in import_data if row.get("package_id")}
+        existing = {}
+        if bubble_ids:
+            rows = self.db.query(Package.id, Package.bubble_id, Package.name).filter(Package.bubble_id.in_(bubble_ids))
+            existing = {bubble_id: (package_id, name) for package_id, bubble_id, name in rows}
+
+        now = datetime.now(timezone.utc)
+        updates = []
         for row in import_data:
-            try:
-                bubble_id = row.get("package_id")
-                if not bubble_id:
-                    continue # Skip empty rows
-
-                pkg = self.get_package(bubble_id)
-                if not pkg:
-                    raise ValueError(f"Package ID '{bubble_id}' not found in database")
-
-                # Verification: Check if name matches (safety check for row shifts)
-                import_name = row.get("name")
-                if import_name and pkg.name != import_name:
-                    results["warnings"].append(f"Name mismatch for {bubble_id}: DB has '{pkg.name}', import has '{import_name}'. Updated anyway.")
-
-                # Update allowed fields
-                if "price" in row:
-                    pkg.price = row["price"] # Already Decimal from API validation
-                
-                if "invoice_description" in row:
-                    pkg.invoice_desc = row["invoice_description"]
-
-                if "internal_description" in row:
-                    pkg.description = row["internal_description"]
-                
-                pkg.modified_date = datetime.now(timezone.utc)
-                results["updated"] += 1
-            except Exception as e:
+            bubble_id = row.get("package_id")
+            if not bubble_id:
+                continue # Skip empty rows
+
+            if bubble_id not in existing:
                 results["failed"] += 1
-                results["errors"].append(f"Row {row.get('package_id', 'unknown')}: {str(e)}")
+                results["errors"].append(f"Row {bubble_id}: Package ID '{bubble_id}' not found in database")
+                continue
+            package_id, db_name = existing[bubble_id]
+
+            # Verification: Check if name matches (safety check for row shifts)
+            import_name = row.get("name")
+            if import_name and db_name != import_name:
+                results["warnings"].append(f"Name mismatch for {bubble_id}: DB has '{db_name}', import has '{import_name}'. Updated anyway.")
+
+            # Update allowed fields only (price is already Decimal from API validation)
+            values = {"id": package_id, "modified_date": now}
+            values.update({column: row[field] for field, column in _IMPORT_COLUMNS.items() if field in row})
+            updates.append(values)
+            results["updated"] += 1
 
-        if results["updated"] > 0:
-            self.db.commit()
+        if updates:
+            # ORM bulk UPDATE by primary key - rows with the same columns go out as one executemany
+            self.db.execute(update(Package), updates)
         
         return results
 
@@ -1,7 +1,40 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import select, insert, update, delete, bindparam, any_, String
+from sqlalchemy.dialects.postgresql import ARRAY
 from typing import Optional, List, Dict
 from app.models.tag_registry import TagRegistry, TagCategory
+from app.utils.session_hooks import on_commit
+import copy
+import time
+
+
+# Core selects built once at import - compiled once and reused from SQLAlchemy's statement cache
+# tag = ANY(:tags) binds one array, so the SQL is the same whatever the number of tags
+_VALID_TAGS_QUERY = select(TagRegistry.tag).where(
+    TagRegistry.tag == any_(bindparam("tags", type_=ARRAY(String)))
+)
+_GET_TAG_QUERY = select(
+    TagRegistry.tag, TagRegistry.category, TagRegistry.description
+).where(TagRegistry.tag == bindparam("tag"))
+
+_ALL_TAGS_QUERY = select(
+    TagRegistry.tag, TagRegistry.category, TagRegistry.description
+).order_by(TagRegistry.category, TagRegistry.tag)
+
+# INSERT ... RETURNING in one round trip (server defaults come back with the row)
+_INSERT_TAG = insert(TagRegistry).returning(TagRegistry)
+
+# Process-level cache of get_all_tags: (expires_at, version, tags_by_category).
+# The TTL bounds staleness across worker processes; within a process every
+# committed tag write bumps _tags_version so the next read reloads.
+_TAGS_CACHE_TTL_SECONDS = 300
+_tags_version = 0
+_tags_cache = None
+
+
+def _bump_tags_version() -> None:
+    global _tags_version
+    _tags_version += 1
 
 
 class TagRegistryRepository:
@@ -11,48 +44,45 @@ class TagRegistryRepository:
         self.db = db
 
     def get_all_tags(self) -> List[Dict]:
-        """Get all tags grouped by category"""
-        query = text("""
-            SELECT tag, category, description
-            FROM tag_registry
-            ORDER BY category, tag
-        """)
-        
-        result = self.db.execute(query)
-        rows = result.fetchall()
-        
+        """Get all tags grouped by category (cached per process)"""
+        global _tags_cache
+        cached = _tags_cache
+        if cached is not None and cached[1] == _tags_version and cached[0] >= time.monotonic():
+            return copy.deepcopy(cached[2])
+
+        # Read the version before the query so a concurrent write is never cached as current
+        version = _tags_version
         tags_by_category = {
             "app": [],
             "function": [],
             "department": []
         }
         
-        for row in rows:
-            tags_by_category[row.category].append({
+        for row in self.db.execute(_ALL_TAGS_QUERY):
+            category = row.category.value
+            tags_by_category[category].append({
                 'tag': row.tag,
-                'category': row.category,
+                'category': category,
                 'description': row.description
             })
         
-        return tags_by_category
+        _tags_cache = (time.monotonic() + _TAGS_CACHE_TTL_SECONDS, version, tags_by_category)
+        return copy.deepcopy(tags_by_category)
+
+    def _invalidate_cache_on_commit(self) -> None:
+        """Drop the cached tag list once the caller's transaction commits"""
+        on_commit(self.db, "tags_cache", _bump_tags_version)
 
     def get_tag(self, tag: str) -> Optional[Dict]:
         """Get a specific tag"""
-        query = text("""
-            SELECT tag, category, description
-            FROM tag_registry
-            WHERE tag = :tag
-        """)
-        
-        result = self.db.execute(query, {"tag": tag})
-        row = result.fetchone()
+        row = self.db.execute(_GET_TAG_QUERY, {"tag": tag}).first()
         
         if not row:
             return None
         
         return {
             'tag': row.tag,
-            'category': row.category,
+            'category': row.category.value,
             'description': row.description
         }
 
@@ -63,14 +93,12 @@ class TagRegistryRepository:
         description: Optional[str] = None
     ) -> TagRegistry:
         """Create a new tag in registry"""
-        tag_registry = TagRegistry(
-            tag=tag,
-            category=category,
-            description=description
-        )
-        self.db.add(tag_registry)
-        self.db.commit()
-        self.db.refresh(tag_registry)
+        tag_registry = self.db.execute(_INSERT_TAG, {
+            "tag": tag,
+            "category": category,
+            "description": description,
+        }).scalar_one()
+        self._invalidate_cache_on_commit()
         return tag_registry
 
     def update_tag(
@@ -79,28 +107,29 @@ class TagRegistryRepository:
         category: Optional[TagCategory] = None,
         description: Optional[str] = None
     ) -> Optional[TagRegistry]:
-        """Update a tag in registry"""
-        tag_registry = self.db.query(TagRegistry).filter(TagRegistry.tag == tag).first()
-        if not tag_registry:
-            return None
-        
-        if category is not None:
-            tag_registry.category = category
-        if description is not None:
-            tag_registry.description = description
-        
-        self.db.commit()
-        self.db.refresh(tag_registry)
+        """Update a tag in registry (UPDATE ... RETURNING - no load before the write)"""
+        values = {"category": category, "description": description}
+        values = {key: value for key, value in values.items() if value is not None}
+        if not values:
+            # Nothing to change
+            return self.db.query(TagRegistry).filter(TagRegistry.tag == tag).first()
+
+        tag_registry = self.db.execute(
+            update(TagRegistry).where(TagRegistry.tag == tag).values(**values).returning(TagRegistry)
+        ).scalar_one_or_none()
+        if tag_registry:
+            self._invalidate_cache_on_commit()
         return tag_registry
 
     def delete_tag(self, tag: str) -> bool:
         """Delete a tag from registry"""
-        tag_registry = self.db.query(TagRegistry).filter(TagRegistry.tag == tag).first()
-        if not tag_registry:
+        deleted_id = self.db.execute(
+            delete(TagRegistry).where(TagRegistry.tag == tag).returning(TagRegistry.id)
+        ).scalar_one_or_none()
+        if deleted_id is None:
             return False
-        
-        self.db.delete(tag_registry)
-        self.db.commit()
+
+        self._invalidate_cache_on_commit()
         return True
 
     def validate_tags(self, tags: List[str]) -> tuple[List[str], List[str]]:
@@ -108,13 +137,17 @@ class TagRegistryRepository:
         if not tags:
             return [], []
         
+        # Dedupe (order preserved) so duplicates are neither sent nor reported twice
+        requested = list(dict.fromkeys(tags))
+
         # Get all valid tags from registry
-        query = text("SELECT tag FROM tag_registry WHERE tag = ANY(:tags)")
-        result = self.db.execute(query, {"tags": tags})
-        valid_tags_in_db = {row.tag for row in result.fetchall()}
+        result = self.db.execute(_VALID_TAGS_QUERY, {"tags": requested})
+        valid_tags_in_db = {row.tag for row in result}
         
-        valid_tags = [t for t in tags if t in valid_tags_in_db]
-        invalid_tags = [t for t in tags if t not in valid_tags_in_db]
+        # Single pass split into valid/invalid
+        valid_tags, invalid_tags = [], []
+        for t in requested:
+            (valid_tags if t in valid_tags_in_db else invalid_tags).append(t)
         
         return valid_tags, invalid_tags
 
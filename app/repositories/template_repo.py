@@ -1,9 +1,22 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import insert, update, or_, exists
 from typing import Optional, List
 from app.models.template import InvoiceTemplate
+from app.repositories.invoice_repo import InvoiceRepository
+from app.utils.pagination import keyset_page, count_rows
+from app.utils.session_hooks import on_commit
 import secrets
 
 
+# INSERT ... RETURNING in one round trip (server defaults come back with the row)
+_INSERT_TEMPLATE = insert(InvoiceTemplate).returning(InvoiceTemplate)
+
+# Existence check inside _set_default's UPDATE
+_target_template = aliased(InvoiceTemplate)
+
+# Attributes update() may set from kwargs
+_TEMPLATE_COLUMNS = frozenset(InvoiceTemplate.__mapper__.column_attrs.keys())
+
 class TemplateRepository:
     def __init__(self, db: Session):
         self.db = db
@@ -29,33 +42,27 @@ class TemplateRepository:
         """Create a new invoice template"""
         bubble_id = f"tmpl_{secrets.token_hex(8)}"
 
-        # If setting as default, remove default from others
+        template = self.db.execute(_INSERT_TEMPLATE, {
+            "bubble_id": bubble_id,
+            "template_name": template_name,
+            "company_name": company_name,
+            "company_address": company_address,
+            "company_phone": company_phone,
+            "company_email": company_email,
+            "sst_registration_no": sst_registration_no,
+            "bank_name": bank_name,
+            "bank_account_no": bank_account_no,
+            "bank_account_name": bank_account_name,
+            "logo_url": logo_url,
+            "terms_and_conditions": terms_and_conditions,
+            "disclaimer": disclaimer,
+            "apply_sst": apply_sst,
+            "is_default": False,
+            "created_by": created_by,
+        }).scalar_one()
         if is_default:
-            self.db.query(InvoiceTemplate).filter(
-                InvoiceTemplate.is_default == True
-            ).update({"is_default": False})
-
-        template = InvoiceTemplate(
-            bubble_id=bubble_id,
-            template_name=template_name,
-            company_name=company_name,
-            company_address=company_address,
-            company_phone=company_phone,
-            company_email=company_email,
-            sst_registration_no=sst_registration_no,
-            bank_name=bank_name,
-            bank_account_no=bank_account_no,
-            bank_account_name=bank_account_name,
-            logo_url=logo_url,
-            terms_and_conditions=terms_and_conditions,
-            disclaimer=disclaimer,
-            apply_sst=apply_sst,
-            is_default=is_default,
-            created_by=created_by,
-        )
-        self.db.add(template)
-        self.db.commit()
-        self.db.refresh(template)
+            self._set_default(bubble_id)
+        self._invalidate_cache_on_commit()
         return template
 
     def get_by_id(self, bubble_id: str) -> Optional[InvoiceTemplate]:
@@ -74,67 +81,107 @@ class TemplateRepository:
         skip: int = 0,
         limit: int = 100,
         active_only: bool = True,
-    ) -> tuple[List[InvoiceTemplate], int]:
-        """Get all templates"""
+        cursor: Optional[str] = None,
+        include_total: bool = False,
+    ) -> tuple[List[InvoiceTemplate], Optional[int], Optional[str]]:
+        """
+        Get all templates (default first, then newest)
+        Keyset-paginated: pass the previous page's next_cursor as cursor
+        Returns (templates, total, next_cursor) - total is only computed when include_total
+        (estimated from table statistics when no filter is applied)
+        """
         query = self.db.query(InvoiceTemplate)
 
         if active_only:
             query = query.filter(InvoiceTemplate.active == True)
 
-        query = query.order_by(InvoiceTemplate.is_default.desc(), InvoiceTemplate.created_at.desc())
-
-        total = query.count()
-        templates = query.offset(skip).limit(limit).all()
-        return templates, total
+        total = count_rows(self.db, query, "invoice_template", bool(active_only)) if include_total else None
+        templates, next_cursor = keyset_page(
+            query,
+            (InvoiceTemplate.is_default, InvoiceTemplate.created_at, InvoiceTemplate.id),
+            limit,
+            cursor=cursor,
+            skip=skip,
+        )
+        return templates, total, next_cursor
 
     def update(
         self,
         bubble_id: str,
         **kwargs
     ) -> Optional[InvoiceTemplate]:
-        """Update template"""
-        template = self.get_by_id(bubble_id)
+        """Update template (UPDATE ... RETURNING - no load before the write)"""
+        make_default = kwargs.pop("is_default", None)
+
+        values = {key: value for key, value in kwargs.items() if key in _TEMPLATE_COLUMNS and value is not None}
+        if make_default is False:
+            values["is_default"] = False
+
+        template = None
+        if values:
+            template = self.db.execute(
+                update(InvoiceTemplate)
+                .where(InvoiceTemplate.bubble_id == bubble_id)
+                .values(**values)
+                .returning(InvoiceTemplate)
+            ).scalar_one_or_none()
+            if not template:
+                return None
+
+        # Handle setting as default
+        if make_default:
+            template = self._set_default(bubble_id)
+        elif template is None:
+            # Nothing to change
+            template = self.get_by_id(bubble_id)
         if not template:
             return None
 
-        # Handle setting as default
-        if kwargs.get("is_default"):
-            self.db.query(InvoiceTemplate).filter(
-                InvoiceTemplate.is_default == True,
-                InvoiceTemplate.bubble_id != bubble_id
-            ).update({"is_default": False})
-
-        for key, value in kwargs.items():
-            if hasattr(template, key) and value is not None:
-                setattr(template, key, value)
-
-        self.db.commit()
-        self.db.refresh(template)
+        # Default may have moved to/from this template - clear everything
+        self._invalidate_cache_on_commit()
         return template
 
     def delete(self, bubble_id: str) -> bool:
         """Delete template (soft delete - set active=False)"""
-        template = self.get_by_id(bubble_id)
-        if not template:
+        deleted_id = self.db.execute(
+            update(InvoiceTemplate)
+            .where(InvoiceTemplate.bubble_id == bubble_id)
+            .values(active=False, is_default=False)
+            .returning(InvoiceTemplate.id)
+        ).scalar_one_or_none()
+        if deleted_id is None:
             return False
 
-        template.active = False
-        template.is_default = False
-        self.db.commit()
+        self._invalidate_cache_on_commit(bubble_id)
         return True
 
+    def _set_default(self, bubble_id: str) -> Optional[InvoiceTemplate]:
+        """
+        Make bubble_id the only default template in one atomic UPDATE ... RETURNING (no commit)
+        Returns the template, or None if not found (the current default is then left alone)
+        """
+        self.db.flush()
+        templates = self.db.execute(
+            update(InvoiceTemplate)
+            .where(or_(InvoiceTemplate.is_default, InvoiceTemplate.bubble_id == bubble_id))
+            .where(exists().where(_target_template.bubble_id == bubble_id))
+            .values(is_default=(InvoiceTemplate.bubble_id == bubble_id))
+            .returning(InvoiceTemplate)
+        ).scalars().all()
+        return next((template for template in templates if template.bubble_id == bubble_id), None)
+
+    def _invalidate_cache_on_commit(self, template_id: Optional[str] = None) -> None:
+        """Drop cached template data once the caller's transaction commits"""
+        on_commit(
+            self.db,
+            ("template_cache", template_id),
+            lambda: InvoiceRepository.invalidate_template_cache(template_id),
+        )
+
     def set_default(self, bubble_id: str) -> Optional[InvoiceTemplate]:
         """Set template as default"""
-        # Remove default from all others
-        self.db.query(InvoiceTemplate).filter(
-            InvoiceTemplate.is_default == True
-        ).update({"is_default": False})
-
-        # Set this as default
-        template = self.get_by_id(bubble_id)
+        template = self._set_default(bubble_id)
         if template:
-            template.is_default = True
-            self.db.commit()
-            self.db.refresh(template)
+            self._invalidate_cache_on_commit()
 
         return template
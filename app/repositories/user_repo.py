@@ -1,7 +1,152 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, column, DateTime, String
 from typing import Optional, List, Tuple
 from datetime import datetime, timezone
+import itertools
+import os
+import time
+from app.utils.pagination import encode_cursor, decode_cursor
+
+
+# get_all sort keys -> user_with_agent columns (anything else sorts by registration_date)
+_SORT_COLUMNS = {
+    "name": "v.name",
+    "email": "v.email",
+    "whatsapp_number": "v.agent_contact",
+    "registration_date": "v.registration_date",
+}
+
+# Cursor layout for get_all: (sort value, user bubble_id) - the type decodes the sort value
+_SORT_VALUE_TYPES = {
+    "name": String(),
+    "email": String(),
+    "whatsapp_number": String(),
+}
+_CURSOR_ID = column("bubble_id", String())
+
+# User ids matching a search, by search mode. Each table is matched on its own so its
+# indexes can serve the predicates (an OR across both sides of the join can only be checked row by row)
+_SEARCH_USER_IDS = {
+    # ILIKE '%term%' - trigram indexes
+    "contains": """(
+        SELECT id FROM "user"
+        WHERE bubble_id ILIKE :search OR auth_email ILIKE :search
+        UNION
+        SELECT su.id FROM "user" su
+        JOIN agent sa ON sa.bubble_id = su.linked_agent_profile
+        WHERE sa.name ILIKE :search OR sa.contact ILIKE :search OR sa.email ILIKE :search
+    )""",
+    # lower(col) LIKE 'term%' - lower(col) text_pattern_ops btree indexes
+    "prefix": """(
+        SELECT id FROM "user"
+        WHERE lower(bubble_id) LIKE :search OR lower(auth_email) LIKE :search
+        UNION
+        SELECT su.id FROM "user" su
+        JOIN agent sa ON sa.bubble_id = su.linked_agent_profile
+        WHERE lower(sa.name) LIKE :search OR lower(sa.contact) LIKE :search OR lower(sa.email) LIKE :search
+    )""",
+}
+
+
+def _build_get_all_query(sort_key: str, sort_direction: str, search_mode: Optional[str], seek: Optional[str],
+                         window_total: bool, offset: bool):
+    """
+    SQL for one get_all variant
+    search_mode: None (no search), "contains" or "prefix"
+    seek: None (first page), "value" or "null" (cursor sort value is NULL - NULLs sort last)
+    """
+    sort_column = _SORT_COLUMNS[sort_key]
+    total_column = ",\n        COUNT(*) OVER () as total_count" if window_total else ""
+    
+    # user_with_agent falls back to the email/whatsapp from authentication JSON when agent data is NULL
+    # (migrations/create_user_with_agent_view.sql)
+    query = f"""
+    SELECT
+        v.user_bubble_id,
+        v.agent_bubble_id,
+        v.name,
+        v.whatsapp_number,
+        v.email,
+        v.registration_date,
+        v.linked_agent_profile,
+        v.access_level,
+        {sort_column} as sort_value{total_column}
+    FROM user_with_agent v
+"""
+    
+    conditions = []
+    if search_mode:
+        conditions.append(f"v.user_id IN {_SEARCH_USER_IDS[search_mode]}")
+    
+    # Seek past the cursor row instead of OFFSET (NULLs sort last in both directions)
+    op = "<" if sort_direction == "DESC" else ">"
+    if seek == "null":
+        conditions.append(f"({sort_column} IS NULL AND v.user_bubble_id {op} :cur_id)")
+    elif seek == "value":
+        conditions.append(
+            f"({sort_column} {op} :cur_value OR {sort_column} IS NULL"
+            f" OR ({sort_column} = :cur_value AND v.user_bubble_id {op} :cur_id))"
+        )
+    
+    if conditions:
+        query += "    WHERE " + " AND ".join(conditions) + "\n"
+    
+    # bubble_id breaks ties so the order is total and the cursor is exact
+    query += f"    ORDER BY {sort_column} {sort_direction} NULLS LAST, v.user_bubble_id {sort_direction}\n"
+    query += "    LIMIT :limit"
+    if offset:
+        query += " OFFSET :offset"
+    return text(query)
+
+
+# Every get_all variant built once at import (4 sorts x 2 directions x search x seek x total x offset),
+# so a request only binds parameters and always hits the same compiled-cache entry
+_GET_ALL_QUERIES = {
+    key: _build_get_all_query(*key)
+    for key in itertools.product(
+        _SORT_COLUMNS, ("ASC", "DESC"), (None, *_SEARCH_USER_IDS), (None, "value", "null"), (False, True), (False, True)
+    )
+    # A cursor page never uses OFFSET or the window count
+    if not (key[3] and (key[4] or key[5]))
+}
+
+# Total past the first page (the window count only sees the remaining rows there)
+# Every user is one row of user_with_agent and the search matches user ids, so neither needs the agent join
+_COUNT_USERS_QUERY = text('SELECT COUNT(*) FROM "user"')
+_COUNT_USERS_SEARCH_QUERIES = {
+    mode: text(f'SELECT COUNT(*) FROM "user" WHERE id IN {user_ids}')
+    for mode, user_ids in _SEARCH_USER_IDS.items()
+}
+
+# Single-user lookup, built once at import so every call hits the same compiled-cache entry
+_GET_BY_ID_QUERY = text("""
+    SELECT user_bubble_id, registration_date, linked_agent_profile, access_level,
+           agent_bubble_id, name, whatsapp_number, email
+    FROM user_with_agent
+    WHERE user_bubble_id = :user_bubble_id
+""")
+
+# Create the agent profile, or update only the fields flagged set_* (an empty value clears to NULL)
+# updated_at is stamped on UPDATE by the set_updated_at trigger (migrations/add_updated_at_triggers.sql)
+_UPSERT_AGENT = text("""
+    INSERT INTO agent (bubble_id, name, contact, email, created_at, updated_at, created_date)
+    VALUES (:agent_bubble_id, :name, :contact, :email, NOW(), NOW(), NOW())
+    ON CONFLICT (bubble_id) DO UPDATE
+    SET name = CASE WHEN :set_name THEN NULLIF(EXCLUDED.name, '') ELSE agent.name END,
+        contact = CASE WHEN :set_contact THEN NULLIF(EXCLUDED.contact, '') ELSE agent.contact END,
+        email = CASE WHEN :set_email THEN NULLIF(EXCLUDED.email, '') ELSE agent.email END
+    RETURNING bubble_id as agent_bubble_id, name, contact, email
+""")
+
+_INSERT_AGENT = text("""
+    INSERT INTO agent (bubble_id, name, contact, email, created_at, updated_at, created_date)
+    VALUES (:agent_bubble_id, :name, :contact, :email, NOW(), NOW(), NOW())
+""")
+
+_INSERT_USER = text("""
+    INSERT INTO "user" (bubble_id, linked_agent_profile, created_date, created_at, updated_at)
+    VALUES (:user_bubble_id, :linked_agent_profile, NOW(), NOW(), NOW())
+""")
 
 
 class UserRepository:
@@ -10,6 +155,18 @@ class UserRepository:
     def __init__(self, db: Session):
         self.db = db
 
+    def _generate_bubble_ids(self, n: int) -> List[str]:
+        """
+        Generate n Bubble-style bubble_ids: "<ms timestamp>x<18 random digits>"
+        The clock and os.urandom are each read once for the whole batch
+        """
+        prefix = f"{time.time_ns() // 1_000_000}x"
+        raw = os.urandom(8 * n)
+        return [
+            f"{prefix}{100000000000000000 + int.from_bytes(raw[i:i + 8], 'big') % 900000000000000000}"
+            for i in range(0, 8 * n, 8)
+        ]
+
     def get_all(
         self,
         skip: int = 0,
@@ -17,105 +174,17 @@ class UserRepository:
         search: Optional[str] = None,
         sort_by: Optional[str] = "registration_date",
         sort_order: Optional[str] = "desc",
-    ) -> Tuple[List[dict], int]:
-        """Get all users with their agent profiles, sorted by specified column"""
-        # Build the query
-        # Extract email from authentication JSON as fallback if agent data is NULL
-        # Authentication JSON structure: {"email": {"email": "xxx@gmail.com"}}
-        query = """
-            SELECT 
-                u.bubble_id as user_bubble_id,
-                u.created_date as registration_date,
-                u.linked_agent_profile,
-                u.access_level as access_level,
-                u.authentication,
-                a.bubble_id as agent_bubble_id,
-                COALESCE(
-                    a.name,
-                    CASE 
-                        WHEN u.authentication IS NOT NULL 
-                             AND u.authentication::jsonb->'email' IS NOT NULL
-                             AND u.authentication::jsonb->'email'->>'email' IS NOT NULL
-                        THEN u.authentication::jsonb->'email'->>'email'
-                        ELSE NULL
-                    END
-                ) as name,
-                COALESCE(
-                    a.contact,
-                    CASE 
-                        WHEN u.authentication IS NOT NULL 
-                             AND u.authentication::jsonb->'whatsapp' IS NOT NULL
-                        THEN 
-                            CASE 
-                                WHEN jsonb_typeof(u.authentication::jsonb->'whatsapp') = 'object'
-                                THEN COALESCE(
-                                    u.authentication::jsonb->'whatsapp'->>'number',
-                                    u.authentication::jsonb->'whatsapp'->>'phone'
-                                )
-                                ELSE u.authentication::jsonb->>'whatsapp'
-                            END
-                        ELSE NULL
-                    END,
-                    CASE 
-                        WHEN u.authentication IS NOT NULL 
-                             AND u.authentication::jsonb->>'phone' IS NOT NULL
-                        THEN u.authentication::jsonb->>'phone'
-                        ELSE NULL
-                    END
-                ) as whatsapp_number,
-                COALESCE(
-                    a.email,
-                    CASE 
-                        WHEN u.authentication IS NOT NULL 
-                             AND u.authentication::jsonb->'email' IS NOT NULL
-                             AND u.authentication::jsonb->'email'->>'email' IS NOT NULL
-                        THEN u.authentication::jsonb->'email'->>'email'
-                        ELSE NULL
-                    END
-                ) as email
-            FROM "user" u
-            LEFT JOIN agent a ON u.linked_agent_profile = a.bubble_id
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+        search_mode: str = "contains",
+    ) -> Tuple[List[dict], Optional[int], Optional[str]]:
         """
-        
-        params = {}
-        
-        if search:
-            query += """
-                WHERE a.name ILIKE :search 
-                   OR a.contact ILIKE :search 
-                   OR a.email ILIKE :search
-                   OR u.bubble_id ILIKE :search
-                   OR (u.authentication IS NOT NULL 
-                       AND u.authentication::jsonb->'email'->>'email' ILIKE :search)
-            """
-            params['search'] = f"%{search}%"
-        
-        # Validate and set sort column
-        # Use the same COALESCE logic for sorting
-        if sort_by == "name":
-            sort_column = """COALESCE(a.name,
-                CASE 
-                    WHEN u.authentication IS NOT NULL 
-                         AND u.authentication::jsonb->'email' IS NOT NULL
-                         AND u.authentication::jsonb->'email'->>'email' IS NOT NULL
-                    THEN u.authentication::jsonb->'email'->>'email'
-                    ELSE NULL
-                END
-            )"""
-        elif sort_by == "email":
-            sort_column = """COALESCE(a.email,
-                CASE 
-                    WHEN u.authentication IS NOT NULL 
-                         AND u.authentication::jsonb->'email' IS NOT NULL
-                         AND u.authentication::jsonb->'email'->>'email' IS NOT NULL
-                    THEN u.authentication::jsonb->'email'->>'email'
-                    ELSE NULL
-                END
-            )"""
-        elif sort_by == "whatsapp_number":
-            sort_column = "a.contact"
-        else:
-            sort_column = "u.created_date"
+        Get all users with their agent profiles, sorted by specified column
+        search_mode "contains" matches anywhere, "prefix" matches the start of a value (autocomplete)
+        Keyset-paginated on (sort column, bubble_id): pass the previous page's next_cursor as cursor
+        Returns (users, total, next_cursor) - total is only computed when include_total
+        """
+        sort_key = sort_by if sort_by in _SORT_COLUMNS else "registration_date"
         
         # Safely handle sort_order (defensive programming)
         if sort_order and sort_order.lower() == "desc":
@@ -123,114 +192,65 @@ class UserRepository:
         else:
             sort_direction = "ASC"
         
-        # Handle NULL values in sorting (put NULLs last)
-        if sort_by in ["name", "email", "whatsapp_number"]:
-            query += f" ORDER BY {sort_column} {sort_direction} NULLS LAST"
+        # First page: count the filtered set in the same pass as the page (window count)
+        window_total = include_total and not cursor
+        
+        # limit + 1 detects a next page without another query
+        params = {'limit': limit + 1}
+        if not search:
+            search_mode = None
+        elif search_mode == "prefix":
+            params['search'] = f"{search.lower()}%"
         else:
-            query += f" ORDER BY {sort_column} {sort_direction}"
+            search_mode = "contains"
+            params['search'] = f"%{search}%"
         
-        # Get total count - build count query separately
-        count_query = """
-            SELECT COUNT(*) 
-            FROM "user" u
-            LEFT JOIN agent a ON u.linked_agent_profile = a.bubble_id
-        """
-        if search:
-            count_query += """
-                WHERE a.name ILIKE :search 
-                   OR a.contact ILIKE :search 
-                   OR a.email ILIKE :search
-                   OR u.bubble_id ILIKE :search
-                   OR (u.authentication IS NOT NULL 
-                       AND u.authentication::jsonb->'email'->>'email' ILIKE :search)
-            """
+        seek = None
+        if cursor:
+            sort_type = _SORT_VALUE_TYPES.get(sort_key, DateTime(timezone=True))
+            cur_value, params['cur_id'] = decode_cursor(cursor, (column("sort_value", sort_type), _CURSOR_ID))
+            if cur_value is None:
+                seek = "null"
+            else:
+                seek = "value"
+                params['cur_value'] = cur_value
+        elif skip:
+            # Numbered-page jump - only without a cursor
+            params['offset'] = skip
         
-        total_result = self.db.execute(text(count_query), params)
-        total = total_result.scalar() or 0
+        query = _GET_ALL_QUERIES[
+            (sort_key, sort_direction, search_mode, seek, window_total, 'offset' in params)
+        ]
+        rows = self.db.execute(query, params).mappings().all()
         
-        # Get paginated results
-        query += " LIMIT :limit OFFSET :offset"
-        params['limit'] = limit
-        params['offset'] = skip
+        total = None
+        if window_total and (rows or not skip):
+            total = rows[0]['total_count'] if rows else 0
+        elif include_total:
+            # Past the cursor (or an OFFSET beyond the end) the window only sees the remaining rows
+            count_query = _COUNT_USERS_SEARCH_QUERIES[search_mode] if search_mode else _COUNT_USERS_QUERY
+            total = self.db.execute(count_query, params).scalar() or 0
         
-        result = self.db.execute(text(query), params)
-        rows = result.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor([last['sort_value'], last['user_bubble_id']])
         
-        # Convert to list of dicts
+        # Convert to list of dicts - the SELECT list is already in response order
+        # (user_with_agent returns access_level as '{}' rather than NULL)
         users = []
         for row in rows:
-            users.append({
-                'user_bubble_id': row.user_bubble_id,
-                'agent_bubble_id': row.agent_bubble_id,
-                'name': row.name,
-                'whatsapp_number': row.whatsapp_number,
-                'email': row.email,
-                'registration_date': row.registration_date,
-                'linked_agent_profile': row.linked_agent_profile,
-                'access_level': list(row.access_level) if row.access_level else [],
-            })
+            user = dict(row)
+            del user['sort_value']
+            user.pop('total_count', None)
+            users.append(user)
         
-        return users, total
+        return users, total, next_cursor
 
     def get_by_id(self, user_bubble_id: str) -> Optional[dict]:
         """Get user by bubble_id"""
-        query = text("""
-            SELECT 
-                u.bubble_id as user_bubble_id,
-                u.created_date as registration_date,
-                u.linked_agent_profile,
-                u.access_level as access_level,
-                u.authentication,
-                a.bubble_id as agent_bubble_id,
-                COALESCE(
-                    a.name,
-                    CASE 
-                        WHEN u.authentication IS NOT NULL 
-                             AND u.authentication::jsonb->'email' IS NOT NULL
-                             AND u.authentication::jsonb->'email'->>'email' IS NOT NULL
-                        THEN u.authentication::jsonb->'email'->>'email'
-                        ELSE NULL
-                    END
-                ) as name,
-                COALESCE(
-                    a.contact,
-                    CASE 
-                        WHEN u.authentication IS NOT NULL 
-                             AND u.authentication::jsonb->'whatsapp' IS NOT NULL
-                        THEN 
-                            CASE 
-                                WHEN jsonb_typeof(u.authentication::jsonb->'whatsapp') = 'object'
-                                THEN COALESCE(
-                                    u.authentication::jsonb->'whatsapp'->>'number',
-                                    u.authentication::jsonb->'whatsapp'->>'phone'
-                                )
-                                ELSE u.authentication::jsonb->>'whatsapp'
-                            END
-                        ELSE NULL
-                    END,
-                    CASE 
-                        WHEN u.authentication IS NOT NULL 
-                             AND u.authentication::jsonb->>'phone' IS NOT NULL
-                        THEN u.authentication::jsonb->>'phone'
-                        ELSE NULL
-                    END
-                ) as whatsapp_number,
-                COALESCE(
-                    a.email,
-                    CASE 
-                        WHEN u.authentication IS NOT NULL 
-                             AND u.authentication::jsonb->'email' IS NOT NULL
-                             AND u.authentication::jsonb->'email'->>'email' IS NOT NULL
-                        THEN u.authentication::jsonb->'email'->>'email'
-                        ELSE NULL
-                    END
-                ) as email
-            FROM "user" u
-            LEFT JOIN agent a ON u.linked_agent_profile = a.bubble_id
-            WHERE u.bubble_id = :user_bubble_id
-        """)
-        
-        result = self.db.execute(query, {"user_bubble_id": user_bubble_id})
+        result = self.db.execute(_GET_BY_ID_QUERY, {"user_bubble_id": user_bubble_id})
         row = result.fetchone()
         
         if not row:
@@ -244,7 +264,7 @@ class UserRepository:
             'email': row.email,
             'registration_date': row.registration_date,
             'linked_agent_profile': row.linked_agent_profile,
-            'access_level': list(row.access_level) if row.access_level else [],
+            'access_level': row.access_level,
         }
 
     def update_user(
@@ -256,17 +276,27 @@ class UserRepository:
         linked_agent_profile: Optional[str] = None,
         access_level: Optional[List[str]] = None,
     ) -> Optional[dict]:
-        """Update user and/or agent profile"""
-        # First, get the current user
-        user = self.get_by_id(user_bubble_id)
-        if not user:
-            return None
+        """
+        Update user and/or agent profile
+        One UPDATE ... RETURNING for the user (joined to its agent) and one agent upsert
+        """
+        # If we're updating name/whatsapp/email, we need an agent profile
+        needs_agent_update = name is not None or whatsapp_number is not None or email is not None
+        
+        if not needs_agent_update and linked_agent_profile is None and access_level is None:
+            return self.get_by_id(user_bubble_id)
         
         # Build update fields dynamically
         update_fields = []
         update_params = {"user_bubble_id": user_bubble_id}
         
-        if linked_agent_profile is not None:
+        if needs_agent_update and not linked_agent_profile:
+            # Keep the current agent profile - link a new one if the user has none
+            update_fields.append(
+                "linked_agent_profile = COALESCE(NULLIF(linked_agent_profile, ''), :new_agent_bubble_id)"
+            )
+            update_params["new_agent_bubble_id"] = self._generate_bubble_ids(1)[0]
+        elif linked_agent_profile is not None:
             update_fields.append("linked_agent_profile = :linked_agent_profile")
             update_params["linked_agent_profile"] = linked_agent_profile
         
@@ -274,90 +304,26 @@ class UserRepository:
             update_fields.append("access_level = :access_level")
             update_params["access_level"] = access_level
         
-        if update_fields:
-            update_fields.append("updated_at = NOW()")
-            update_user_query = text(f"""
-                UPDATE "user"
-                SET {', '.join(update_fields)}
-                WHERE bubble_id = :user_bubble_id
-            """)
-            self.db.execute(update_user_query, update_params)
-        
-        # Update agent profile - create if needed
-        # If we're updating name/whatsapp/email, we need an agent profile
-        needs_agent_update = name is not None or whatsapp_number is not None or email is not None
+        user_row = self._update_user_returning(update_fields, update_params)
+        if not user_row:
+            return None
         
+        agent = user_row
         if needs_agent_update:
-            agent_bubble_id = linked_agent_profile or user.get('linked_agent_profile')
-            
-            # If no agent_bubble_id exists, create a new one
-            if not agent_bubble_id:
-                import time
-                import random
-                timestamp = int(time.time() * 1000)
-                random_part = random.randint(100000000000000000, 999999999999999999)
-                agent_bubble_id = f"{timestamp}x{random_part}"
-                
-                # Update user's linked_agent_profile
-                update_user_link_query = text("""
-                    UPDATE "user"
-                    SET linked_agent_profile = :agent_bubble_id,
-                        updated_at = NOW()
-                    WHERE bubble_id = :user_bubble_id
-                """)
-                self.db.execute(update_user_link_query, {
-                    "agent_bubble_id": agent_bubble_id,
-                    "user_bubble_id": user_bubble_id
-                })
-            
-            # Check if agent exists
-            check_agent_query = text("SELECT bubble_id FROM agent WHERE bubble_id = :agent_bubble_id")
-            agent_exists = self.db.execute(check_agent_query, {"agent_bubble_id": agent_bubble_id}).fetchone()
-            
-            if agent_exists:
-                # Update existing agent
-                # Use a flag to track if we need to update (including clearing fields with None)
-                update_fields = []
-                update_params = {"agent_bubble_id": agent_bubble_id}
-                
-                # Check if any field is being updated (including None to clear)
-                if name is not None:
-                    update_fields.append("name = :name")
-                    update_params["name"] = name if name else None
-                
-                if whatsapp_number is not None:
-                    update_fields.append("contact = :contact")
-                    update_params["contact"] = whatsapp_number if whatsapp_number else None
-                
-                if email is not None:
-                    update_fields.append("email = :email")
-                    update_params["email"] = email if email else None
-                
-                if update_fields:
-                    update_fields.append("updated_at = NOW()")
-                    update_agent_query = text(f"""
-                        UPDATE agent
-                        SET {', '.join(update_fields)}
-                        WHERE bubble_id = :agent_bubble_id
-                    """)
-                    self.db.execute(update_agent_query, update_params)
-            else:
-                # Create new agent profile
-                insert_agent_query = text("""
-                    INSERT INTO agent (bubble_id, name, contact, email, created_at, updated_at, created_date)
-                    VALUES (:agent_bubble_id, :name, :contact, :email, NOW(), NOW(), NOW())
-                """)
-                self.db.execute(insert_agent_query, {
-                    "agent_bubble_id": agent_bubble_id,
-                    "name": name or "",
-                    "contact": whatsapp_number or "",
-                    "email": email or ""
-                })
+            # Create the agent profile or update the fields that were passed ("" clears a field)
+            agent = self.db.execute(_UPSERT_AGENT, {
+                "agent_bubble_id": user_row.linked_agent_profile,
+                "name": name or "",
+                "contact": whatsapp_number or "",
+                "email": email or "",
+                "set_name": name is not None,
+                "set_contact": whatsapp_number is not None,
+                "set_email": email is not None,
+            }).fetchone()
         
         self.db.commit()
         
-        # Return updated user
-        return self.get_by_id(user_bubble_id)
+        return self._updated_user_dict(user_row, agent)
 
     def update_user_tags(
         self,
@@ -365,26 +331,48 @@ class UserRepository:
         tags: List[str],
     ) -> Optional[dict]:
         """Update user access_level tags"""
-        user = self.get_by_id(user_bubble_id)
-        if not user:
+        user_row = self._update_user_returning(
+            ["access_level = :access_level"],
+            {"access_level": tags, "user_bubble_id": user_bubble_id},
+        )
+        if not user_row:
             return None
         
-        # Update access_level in user table
-        update_query = text("""
-            UPDATE "user"
-            SET access_level = :access_level,
-                updated_at = NOW()
-            WHERE bubble_id = :user_bubble_id
-        """)
-        self.db.execute(update_query, {
-            "access_level": tags,
-            "user_bubble_id": user_bubble_id
-        })
-        
         self.db.commit()
         
-        # Return updated user
-        return self.get_by_id(user_bubble_id)
+        return self._updated_user_dict(user_row, user_row)
+
+    def _update_user_returning(self, update_fields: List[str], update_params: dict):
+        """
+        UPDATE the user and return it joined to its agent, in one statement (the trigger stamps updated_at)
+        Returns None if the user doesn't exist
+        """
+        return self.db.execute(text(f"""
+            WITH u AS (
+                UPDATE "user"
+                SET {', '.join(update_fields)}
+                WHERE bubble_id = :user_bubble_id
+                RETURNING bubble_id, created_date, linked_agent_profile,
+                          COALESCE(access_level, '{{}}') as access_level,
+                          auth_email, auth_whatsapp
+            )
+            SELECT u.*, a.bubble_id as agent_bubble_id, a.name, a.contact, a.email
+            FROM u
+            LEFT JOIN agent a ON u.linked_agent_profile = a.bubble_id
+        """), update_params).fetchone()
+
+    def _updated_user_dict(self, user_row, agent) -> dict:
+        """Build the get_by_id-shaped dict from an _update_user_returning row and agent columns"""
+        return {
+            'user_bubble_id': user_row.bubble_id,
+            'agent_bubble_id': agent.agent_bubble_id,
+            'name': agent.name if agent.name is not None else user_row.auth_email,
+            'whatsapp_number': agent.contact if agent.contact is not None else user_row.auth_whatsapp,
+            'email': agent.email if agent.email is not None else user_row.auth_email,
+            'registration_date': user_row.created_date,
+            'linked_agent_profile': user_row.linked_agent_profile,
+            'access_level': user_row.access_level,
+        }
 
     def create_user(
         self,
@@ -394,27 +382,16 @@ class UserRepository:
         linked_agent_profile: Optional[str] = None,
     ) -> dict:
         """Create a new user with agent profile"""
-        import time
-        
-        # Generate bubble_id for user (format: timestamp + random)
-        import random
-        timestamp = int(time.time() * 1000)
-        random_part = random.randint(100000000000000000, 999999999999999999)
-        user_bubble_id = f"{timestamp}x{random_part}"
+        # Generate bubble_ids for the user and a possible new agent in one batch
+        user_bubble_id, agent_bubble_id = self._generate_bubble_ids(2)
         
         # If linked_agent_profile is provided, use it; otherwise create new agent
         if not linked_agent_profile:
             # Create new agent profile
-            agent_timestamp = int(time.time() * 1000)
-            agent_random = random.randint(100000000000000000, 999999999999999999)
-            linked_agent_profile = f"{agent_timestamp}x{agent_random}"
+            linked_agent_profile = agent_bubble_id
             
             # Insert agent first
-            insert_agent_query = text("""
-                INSERT INTO agent (bubble_id, name, contact, email, created_at, updated_at, created_date)
-                VALUES (:agent_bubble_id, :name, :contact, :email, NOW(), NOW(), NOW())
-            """)
-            self.db.execute(insert_agent_query, {
+            self.db.execute(_INSERT_AGENT, {
                 "agent_bubble_id": linked_agent_profile,
                 "name": name,
                 "contact": whatsapp_number or "",
@@ -422,11 +399,7 @@ class UserRepository:
             })
         
         # Insert user
-        insert_user_query = text("""
-            INSERT INTO "user" (bubble_id, linked_agent_profile, created_date, created_at, updated_at)
-            VALUES (:user_bubble_id, :linked_agent_profile, NOW(), NOW(), NOW())
-        """)
-        self.db.execute(insert_user_query, {
+        self.db.execute(_INSERT_USER, {
             "user_bubble_id": user_bubble_id,
             "linked_agent_profile": linked_agent_profile
         })
@@ -436,3 +409,37 @@ class UserRepository:
         # Return created user
         return self.get_by_id(user_bubble_id)
 
+    def create_users_bulk(self, users: List[dict]) -> List[str]:
+        """
+        Create multiple users (and their agent profiles) in one batch per table
+        Each dict takes name and optional whatsapp_number, email and linked_agent_profile
+        Returns the new user bubble_ids in input order
+        """
+        if not users:
+            return []
+        
+        ids = self._generate_bubble_ids(2 * len(users))
+        agent_rows = []
+        user_rows = []
+        for user, user_bubble_id, agent_bubble_id in zip(users, ids[::2], ids[1::2]):
+            linked_agent_profile = user.get("linked_agent_profile")
+            if not linked_agent_profile:
+                linked_agent_profile = agent_bubble_id
+                agent_rows.append({
+                    "agent_bubble_id": agent_bubble_id,
+                    "name": user["name"],
+                    "contact": user.get("whatsapp_number") or "",
+                    "email": user.get("email") or "",
+                })
+            user_rows.append({
+                "user_bubble_id": user_bubble_id,
+                "linked_agent_profile": linked_agent_profile,
+            })
+        
+        # executemany - batched into few round trips by the engine's executemany_mode
+        if agent_rows:
+            self.db.execute(_INSERT_AGENT, agent_rows)
+        self.db.execute(_INSERT_USER, user_rows)
+        self.db.commit()
+        
+        return [row["user_bubble_id"] for row in user_rows]
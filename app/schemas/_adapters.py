@@ -0,0 +1,20 @@
+"""
+Response adapters for the hot read endpoints - built once, at import
+Routes validate and dump straight to JSON bytes in pydantic-core (one pass each)
+instead of FastAPI's validate -> to-python -> encode round
+"""
+from typing import Any
+from pydantic import TypeAdapter
+from app.schemas.invoice import InvoiceResponse, InvoiceListResponse
+from app.schemas.package import PackageListResponse, ProductListResponse
+
+
+INVOICE = TypeAdapter(InvoiceResponse)
+INVOICE_LIST = TypeAdapter(InvoiceListResponse)
+PACKAGE_LIST = TypeAdapter(PackageListResponse)
+PRODUCT_LIST = TypeAdapter(ProductListResponse)
+
+
+def dump_json(adapter: TypeAdapter, content: Any) -> bytes:
+    """Validate content (dicts or ORM rows) with adapter and encode it as JSON"""
+    return adapter.dump_json(adapter.validate_python(content, from_attributes=True))
@@ -0,0 +1,22 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class AppBase(BaseModel):
+    """
+    Base for the API schemas
+    defer_build: the validator/serializer is built on first use, not at import
+    Validation happens once, on input - attribute writes (e.g. users.update_user
+    replacing access_level) and nested instances are never re-validated
+    """
+    model_config = ConfigDict(
+        defer_build=True,
+        from_attributes=True,
+        validate_assignment=False,
+        revalidate_instances="never",
+        arbitrary_types_allowed=False,
+    )
+
+
+class AppResponse(AppBase):
+    """Base for the read-only response schemas - frozen, never mutated after validation"""
+    model_config = ConfigDict(frozen=True)
@@ -1,9 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import Field
 from typing import Optional
 from datetime import datetime
+from app.schemas._base import AppBase, AppResponse
 
 
-class CustomerCreate(BaseModel):
+class CustomerCreate(AppBase):
     name: str = Field(..., min_length=1, max_length=200)
     phone: Optional[str] = None
     email: Optional[str] = None
@@ -17,7 +18,7 @@ class CustomerCreate(BaseModel):
     notes: Optional[str] = None
 
 
-class CustomerUpdate(BaseModel):
+class CustomerUpdate(AppBase):
     name: Optional[str] = Field(None, min_length=1, max_length=200)
     phone: Optional[str] = None
     email: Optional[str] = None
@@ -29,7 +30,7 @@ class CustomerUpdate(BaseModel):
     notes: Optional[str] = None
 
 
-class CustomerResponse(BaseModel):
+class CustomerResponse(AppResponse):
     customer_id: str
     name: str
     phone: Optional[str] = None
@@ -44,6 +45,3 @@ class CustomerResponse(BaseModel):
     notes: Optional[str] = None
     created_at: datetime
     updated_at: datetime
-
-    class Config:
-        from_attributes = True
@@ -1,28 +1,45 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from pydantic import AfterValidator, Field, PlainSerializer, TypeAdapter, field_validator
+from typing import Annotated, Any, Literal, Optional, List, Tuple
+from datetime import date, datetime
 from decimal import Decimal
+from app.schemas._base import AppBase, AppResponse
 
 
-class InvoiceItemCreate(BaseModel):
+# Status values the app writes (see InvoiceNew.status / InvoicePaymentNew.status) - request
+# schemas only; responses stay str so legacy/blank stored statuses still serialize
+InvoiceStatus = Literal["draft", "sent", "viewed", "paid", "partial", "overdue", "cancelled"]
+PaymentStatus = Literal["pending", "verified", "rejected"]
+
+# Request dates are parsed as real dates (pydantic-core) and normalized to "YYYY-MM-DD" -
+# the invoice/payment date columns are strings, so the canonical form is kept (and dumped) as-is
+IsoDate = Annotated[date, AfterValidator(date.isoformat), PlainSerializer(lambda value: value, return_type=str)]
+
+# Request money/percent/qty shapes - bounds match the Numeric columns they are stored in
+Money = Annotated[Decimal, Field(ge=0, max_digits=15, decimal_places=2)]
+PositiveMoney = Annotated[Decimal, Field(gt=0, max_digits=15, decimal_places=2)]
+Percent = Annotated[Decimal, Field(ge=0, le=100, max_digits=5, decimal_places=2)]
+Quantity = Annotated[Decimal, Field(gt=0, max_digits=10, decimal_places=2)]
+
+
+class InvoiceItemCreate(AppBase):
     product_id: Optional[str] = None
     product_name_snapshot: Optional[str] = None
     description: str = Field(..., min_length=1)
-    qty: Decimal = Field(..., gt=0)
-    unit_price: Decimal = Field(..., ge=0)
-    discount_percent: Optional[Decimal] = Field(None, ge=0, le=100)
+    qty: Quantity
+    unit_price: Money
+    discount_percent: Optional[Percent] = None
     sort_order: Optional[int] = 0
 
 
-class InvoiceItemUpdate(BaseModel):
+class InvoiceItemUpdate(AppBase):
     description: Optional[str] = Field(None, min_length=1)
-    qty: Optional[Decimal] = Field(None, gt=0)
-    unit_price: Optional[Decimal] = Field(None, ge=0)
-    discount_percent: Optional[Decimal] = Field(None, ge=0, le=100)
+    qty: Optional[Quantity] = None
+    unit_price: Optional[Money] = None
+    discount_percent: Optional[Percent] = None
     sort_order: Optional[int] = None
 
 
-class InvoiceItemResponse(BaseModel):
+class InvoiceItemResponse(AppResponse):
     bubble_id: str
     product_id: Optional[str] = None
     product_name_snapshot: Optional[str] = None
@@ -34,31 +51,28 @@ class InvoiceItemResponse(BaseModel):
     sort_order: int
     created_at: datetime
 
-    class Config:
-        from_attributes = True
 
-
-class InvoicePaymentCreate(BaseModel):
-    amount: Decimal = Field(..., gt=0)
+class InvoicePaymentCreate(AppBase):
+    amount: PositiveMoney
     payment_method: str = Field(..., min_length=1)
-    payment_date: str
+    payment_date: IsoDate
     reference_no: Optional[str] = None
     bank_name: Optional[str] = None
     notes: Optional[str] = None
     attachment_urls: Optional[List[str]] = None
 
 
-class InvoicePaymentUpdate(BaseModel):
-    amount: Optional[Decimal] = Field(None, gt=0)
+class InvoicePaymentUpdate(AppBase):
+    amount: Optional[PositiveMoney] = None
     payment_method: Optional[str] = Field(None, min_length=1)
-    payment_date: Optional[str] = None
+    payment_date: Optional[IsoDate] = None
     reference_no: Optional[str] = None
     bank_name: Optional[str] = None
     notes: Optional[str] = None
-    status: Optional[str] = None
+    status: Optional[PaymentStatus] = None
 
 
-class InvoicePaymentResponse(BaseModel):
+class InvoicePaymentResponse(AppResponse):
     bubble_id: str
     amount: Decimal
     payment_method: str
@@ -70,73 +84,66 @@ class InvoicePaymentResponse(BaseModel):
     created_by: Optional[str] = None
     created_at: datetime
 
-    class Config:
-        from_attributes = True
 
+# Built once at import - InvoiceResponse validates its nested lists through these
+# The item/payment models are built here too: items/payments are typed Any, so serializing
+# them goes through each model's own serializer, which defer_build would otherwise leave unbuilt
+InvoiceItemResponse.model_rebuild()
+InvoicePaymentResponse.model_rebuild()
+_ITEMS_ADAPTER = TypeAdapter(List[InvoiceItemResponse])
+_PAYMENTS_ADAPTER = TypeAdapter(List[InvoicePaymentResponse])
 
-class InvoiceCreate(BaseModel):
+
+class _InvoiceFields(AppBase):
+    """Fields shared by InvoiceCreate / InvoiceUpdate"""
     customer_id: Optional[str] = None
     template_id: Optional[str] = None
+    agent_id: Optional[str] = None
+    package_id: Optional[str] = None
+    invoice_date: Optional[IsoDate] = None  # Create: defaults to today
+    due_date: Optional[IsoDate] = None
+    discount_percent: Optional[Percent] = None
+    voucher_code: Optional[str] = None
+    internal_notes: Optional[str] = None
+    customer_notes: Optional[str] = None
 
+
+class InvoiceCreate(_InvoiceFields):
     # If customer_id not provided, create new customer
     customer_name: Optional[str] = None
     customer_phone: Optional[str] = None
     customer_email: Optional[str] = None
     customer_address: Optional[str] = None
 
-    # Agent and package
-    agent_id: Optional[str] = None
-    package_id: Optional[str] = None
-
-    # Invoice details
     invoice_number: Optional[str] = None  # Auto-generated if not provided
-    invoice_date: Optional[str] = None  # Defaults to today
-    due_date: Optional[str] = None
-
-    # Discount and voucher
-    discount_percent: Optional[Decimal] = Field(None, ge=0, le=100)
-    voucher_code: Optional[str] = None
     apply_sst: Optional[bool] = False
 
-    # Items
-    items: List[InvoiceItemCreate] = Field(default_factory=list)
-
-    # Notes
-    internal_notes: Optional[str] = None
-    customer_notes: Optional[str] = None
+    # Items (read-only - the shared () default costs no allocation per request)
+    items: Tuple[InvoiceItemCreate, ...] = ()
 
 
-class InvoiceUpdate(BaseModel):
-    customer_id: Optional[str] = None
-    template_id: Optional[str] = None
-    agent_id: Optional[str] = None
-    package_id: Optional[str] = None
-    invoice_date: Optional[str] = None
-    due_date: Optional[str] = None
-    discount_percent: Optional[Decimal] = Field(None, ge=0, le=100)
-    voucher_code: Optional[str] = None
-    status: Optional[str] = None
-    internal_notes: Optional[str] = None
-    customer_notes: Optional[str] = None
+class InvoiceUpdate(_InvoiceFields):
+    status: Optional[InvoiceStatus] = None
 
 
-class InvoiceOnTheFlyRequest(BaseModel):
+class InvoiceOnTheFlyRequest(AppBase):
     package_id: str
-    discount_fixed: Optional[Decimal] = Field(Decimal(0), ge=0)
-    discount_percent: Optional[Decimal] = Field(Decimal(0), ge=0, le=100)
+    discount_fixed: Optional[Money] = Decimal(0)
+    discount_percent: Optional[Percent] = Decimal(0)
     discount_given: Optional[str] = None  # String format: "500 10%" or "500" or "10%"
     apply_sst: bool = False
     template_id: Optional[str] = None
     voucher_code: Optional[str] = None
-    agent_markup: Optional[Decimal] = Field(Decimal(0), ge=0)
+    agent_markup: Optional[Money] = Decimal(0)
     customer_name: Optional[str] = None
     customer_phone: Optional[str] = None
     customer_address: Optional[str] = None
-    epp_fee_amount: Optional[Decimal] = Field(None, ge=0)  # Total EPP fee amount
+    epp_fee_amount: Optional[Money] = None  # Total EPP fee amount
     epp_fee_description: Optional[str] = None  # Combined description: "Maybank EPP 60 Months - RM15000, ..."
 
 
-class InvoiceResponse(BaseModel):
+class InvoiceHeaderResponse(AppResponse):
+    """Invoice without items/payments - for list pages"""
     bubble_id: str
     invoice_number: str
     invoice_date: str
@@ -169,29 +176,42 @@ class InvoiceResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+
+class InvoiceResponse(InvoiceHeaderResponse):
+    """Full invoice (detail endpoints)"""
     # Include items and payments in full response
-    items: List[InvoiceItemResponse] = []
-    payments: List[InvoicePaymentResponse] = []
+    # Typed as Any so the model passes them through - validated in one batch per list below
+    items: List[Any] = Field([], description="InvoiceItemResponse objects")
+    payments: List[Any] = Field([], description="InvoicePaymentResponse objects")
+
+    @field_validator("items")
+    @classmethod
+    def _validate_items(cls, items: List[Any]) -> List[InvoiceItemResponse]:
+        """Validate items with the module-level list adapter (dicts or ORM rows)"""
+        return _ITEMS_ADAPTER.validate_python(items, from_attributes=True)
 
-    class Config:
-        from_attributes = True
+    @field_validator("payments")
+    @classmethod
+    def _validate_payments(cls, payments: List[Any]) -> List[InvoicePaymentResponse]:
+        """Validate payments with the module-level list adapter (dicts or ORM rows)"""
+        return _PAYMENTS_ADAPTER.validate_python(payments, from_attributes=True)
 
 
-class InvoiceListResponse(BaseModel):
+class InvoiceListResponse(AppResponse):
     total: int
     page: int
     page_size: int
-    invoices: List[InvoiceResponse]
+    invoices: List[InvoiceHeaderResponse]
 
 
-class GenerateShareLinkResponse(BaseModel):
+class GenerateShareLinkResponse(AppResponse):
     success: bool
     share_url: Optional[str] = None
     expires_at: Optional[datetime] = None
     message: Optional[str] = None
 
 
-class InvoiceFromURLRequest(BaseModel):
+class InvoiceFromURLRequest(AppBase):
     """Schema for invoice creation from URL parameters (Solar Business)"""
     # Required Solar Business parameters
     package_id: str
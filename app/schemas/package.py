@@ -1,38 +1,38 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import Field
+from typing import Optional, List, Tuple
 from datetime import datetime
+from typing_extensions import Required, TypedDict
 from decimal import Decimal
+from app.schemas._base import AppBase, AppResponse
 
 
-class PackageItemResponse(BaseModel):
-    bubble_id: str
-    product_id: Optional[str] = None
-    product_name: Optional[str] = None
-    brand_name: Optional[str] = None
-    qty: Optional[int] = None
-    total_cost: Optional[int] = None
-    sort: Optional[int] = None
-    inventory: Optional[bool] = None
+class PackageItemResponse(TypedDict, total=False):
+    """Read-only item row (built from joined query rows) - a plain dict, validated once by the response"""
+    bubble_id: Required[str]
+    product_id: Optional[str]
+    product_name: Optional[str]
+    brand_name: Optional[str]
+    qty: Optional[int]
+    total_cost: Optional[int]
+    sort: Optional[int]
+    inventory: Optional[bool]
 
-    class Config:
-        from_attributes = True
 
-
-class PackageItemCreate(BaseModel):
+class PackageItemCreate(AppBase):
     product_id: str = Field(..., description="Product bubble_id")
     qty: int = Field(..., gt=0, description="Quantity")
     total_cost: Optional[int] = Field(None, ge=0, description="Total cost")
     sort: Optional[int] = Field(0, description="Sort order")
 
 
-class PackageItemUpdate(BaseModel):
+class PackageItemUpdate(AppBase):
     product_id: Optional[str] = None
     qty: Optional[int] = Field(None, gt=0)
     total_cost: Optional[int] = Field(None, ge=0)
     sort: Optional[int] = None
 
 
-class PackageCreate(BaseModel):
+class PackageCreate(AppBase):
     name: str = Field(..., min_length=1, description="Package name")
     price: Optional[Decimal] = Field(None, ge=0, description="Package price")
     panel: Optional[str] = Field(None, description="Panel rating/reference")
@@ -45,10 +45,12 @@ class PackageCreate(BaseModel):
     special: Optional[bool] = Field(False, description="Is special package")
     need_approval: Optional[bool] = Field(False, description="Needs approval")
     password: Optional[str] = Field(None, description="Package password")
-    linked_package_items: Optional[List[str]] = Field(default_factory=list, description="List of package_item bubble_ids")
+    # Read-only collections - the shared () default costs no allocation per request
+    linked_package_items: Optional[Tuple[str, ...]] = Field((), description="List of package_item bubble_ids")
+    items: Optional[Tuple[PackageItemCreate, ...]] = Field((), description="New package items to create and link")
 
 
-class PackageUpdate(BaseModel):
+class PackageUpdate(AppBase):
     name: Optional[str] = Field(None, min_length=1)
     price: Optional[Decimal] = Field(None, ge=0)
     panel: Optional[str] = None
@@ -64,7 +66,7 @@ class PackageUpdate(BaseModel):
     linked_package_items: Optional[List[str]] = None
 
 
-class PackageImport(BaseModel):
+class PackageImport(AppBase):
     package_id: str = Field(..., description="The unique bubble_id of the package")
     name: str = Field(..., description="Package name (for reference)")
     price: Decimal = Field(..., ge=0, description="Updated package price")
@@ -73,7 +75,7 @@ class PackageImport(BaseModel):
     items_summary: Optional[str] = Field(None, description="Read-only summary of items")
 
 
-class PackageResponse(BaseModel):
+class PackageResponse(AppResponse):
     id: int
     bubble_id: str
     name: Optional[str] = None
@@ -98,18 +100,17 @@ class PackageResponse(BaseModel):
     # Related data
     items: List[PackageItemResponse] = []
 
-    class Config:
-        from_attributes = True
-
 
-class PackageListResponse(BaseModel):
-    total: int
+class PackageListResponse(AppResponse):
+    total: Optional[int] = None  # Only when include_total=true (estimated if unfiltered)
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as cursor to fetch the next page
+    has_more: bool = False
     packages: List[PackageResponse]
 
 
-class ProductResponse(BaseModel):
+class ProductResponse(AppResponse):
     id: int
     bubble_id: str
     name: Optional[str] = None
@@ -127,18 +128,17 @@ class ProductResponse(BaseModel):
     warranty_link: Optional[str] = None
     product_warranty_desc: Optional[str] = None
 
-    class Config:
-        from_attributes = True
 
-
-class ProductListResponse(BaseModel):
-    total: int
+class ProductListResponse(AppResponse):
+    total: Optional[int] = None  # Only when include_total=true (estimated if unfiltered)
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as cursor to fetch the next page
+    has_more: bool = False
     products: List[ProductResponse]
 
 
-class BrandResponse(BaseModel):
+class BrandResponse(AppResponse):
     id: int
     bubble_id: Optional[str] = None
     name: Optional[str] = None
@@ -147,14 +147,13 @@ class BrandResponse(BaseModel):
     created_date: Optional[datetime] = None
     modified_date: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
-
 
-class BrandListResponse(BaseModel):
-    total: int
+class BrandListResponse(AppResponse):
+    total: Optional[int] = None  # Only when include_total=true (estimated if unfiltered)
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as cursor to fetch the next page
+    has_more: bool = False
     brands: List[BrandResponse]
 
 
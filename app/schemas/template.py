@@ -1,9 +1,14 @@
-from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional
+from pydantic import Field
+from typing import Annotated, Optional
 from datetime import datetime
+from app.schemas._base import AppBase, AppResponse
 
 
-class TemplateCreate(BaseModel):
+# Stored as-is and rendered into <img src="..."> - a cheap pattern check instead of full URL parsing
+LogoUrl = Annotated[str, Field(max_length=2048, pattern=r"^https?://[^\s\"'<>]+$")]
+
+
+class TemplateCreate(AppBase):
     template_name: str = Field(..., min_length=1, max_length=200)
     company_name: str = Field(..., min_length=1, max_length=200)
     company_address: str = Field(..., min_length=1)
@@ -13,14 +18,14 @@ class TemplateCreate(BaseModel):
     bank_name: Optional[str] = None
     bank_account_no: Optional[str] = None
     bank_account_name: Optional[str] = None
-    logo_url: Optional[HttpUrl] = None
+    logo_url: Optional[LogoUrl] = None
     terms_and_conditions: Optional[str] = None
     disclaimer: Optional[str] = None
     apply_sst: Optional[bool] = False
     is_default: Optional[bool] = False
 
 
-class TemplateUpdate(BaseModel):
+class TemplateUpdate(AppBase):
     template_name: Optional[str] = Field(None, min_length=1, max_length=200)
     company_name: Optional[str] = Field(None, min_length=1, max_length=200)
     company_address: Optional[str] = Field(None, min_length=1)
@@ -30,7 +35,7 @@ class TemplateUpdate(BaseModel):
     bank_name: Optional[str] = None
     bank_account_no: Optional[str] = None
     bank_account_name: Optional[str] = None
-    logo_url: Optional[HttpUrl] = None
+    logo_url: Optional[LogoUrl] = None
     terms_and_conditions: Optional[str] = None
     disclaimer: Optional[str] = None
     apply_sst: Optional[bool] = None
@@ -38,7 +43,7 @@ class TemplateUpdate(BaseModel):
     is_default: Optional[bool] = None
 
 
-class TemplateResponse(BaseModel):
+class TemplateResponse(AppResponse):
     bubble_id: Optional[str] = None
     template_name: Optional[str] = None
     company_name: Optional[str] = None
@@ -58,12 +63,11 @@ class TemplateResponse(BaseModel):
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
-
 
-class TemplateListResponse(BaseModel):
-    total: int
+class TemplateListResponse(AppResponse):
+    total: Optional[int] = None  # Only when include_total=true (estimated if unfiltered)
     page: int
     page_size: int
+    next_cursor: Optional[str] = None  # Pass as cursor to fetch the next page
+    has_more: bool = False
     templates: list[TemplateResponse]
\ No newline at end of file
@@ -1,11 +1,11 @@
-from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+from app.schemas._base import AppBase, AppResponse
 
 
-class UserResponse(BaseModel):
+class UserResponse(AppResponse):
     """User response schema"""
-    user_bubble_id: str = Field(..., alias="user_bubble_id")
+    user_bubble_id: str
     agent_bubble_id: Optional[str] = None
     name: Optional[str] = None
     whatsapp_number: Optional[str] = None
@@ -13,13 +13,9 @@ class UserResponse(BaseModel):
     registration_date: Optional[datetime] = None
     linked_agent_profile: Optional[str] = None
     access_level: Optional[List[str]] = []  # Tags/permissions
-    
-    class Config:
-        populate_by_name = True
-        from_attributes = True
 
 
-class UserCreate(BaseModel):
+class UserCreate(AppBase):
     """Schema for creating a new user"""
     name: str
     whatsapp_number: Optional[str] = None
@@ -27,7 +23,7 @@ class UserCreate(BaseModel):
     linked_agent_profile: Optional[str] = None
 
 
-class UserUpdate(BaseModel):
+class UserUpdate(AppBase):
     """Schema for updating a user"""
     name: Optional[str] = None
     whatsapp_number: Optional[str] = None
@@ -36,19 +32,19 @@ class UserUpdate(BaseModel):
     access_level: Optional[List[str]] = None  # Tags/permissions
 
 
-class UserTagsUpdate(BaseModel):
+class UserTagsUpdate(AppBase):
     """Schema for updating user tags only"""
     tags: List[str]  # List of tag strings
 
 
-class TagRegistryResponse(BaseModel):
+class TagRegistryResponse(AppResponse):
     """Tag registry response schema"""
     tag: str
     category: str
     description: Optional[str] = None
 
 
-class TagRegistryCreate(BaseModel):
+class TagRegistryCreate(AppBase):
     """Schema for creating a tag in registry"""
     tag: str
     category: str  # "app", "function", or "department"
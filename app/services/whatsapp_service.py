@@ -1,25 +1,128 @@
+import asyncio
 import httpx
-from typing import Optional
+from typing import List, Optional, Tuple
 from app.config import settings
 from app.utils.helpers import format_phone_number
 
 
+# Max sends in flight for send_messages when the workers are not running (scripts) -
+# with start() the worker count is the bound
+_SEND_CONCURRENCY = 20
+# Background send workers draining the outbound queue (started with the app)
+_SEND_WORKERS = 20
+# How long shutdown waits for queued messages before failing the rest
+_DRAIN_TIMEOUT = 10.0
+# Result for messages still queued (or in flight) when the service shuts down
+_SHUTDOWN_RESULT = {"success": False, "error": "WhatsApp service shut down before the message was sent"}
+
+# Message templates - built once, filled with str.format_map per send
+_OTP_TEMPLATE = """🔐 *Your Verification Code*
+
+{greeting}
+
+Your OTP code is: *{otp_code}*
+
+Valid for 30 minutes. Do not share this code with anyone.
+
+_Eternalgy Invoicing System_"""
+
+_INVOICE_NOTIFICATION_TEMPLATE = """📄 *New Invoice*
+
+Dear {customer_name},
+
+Your invoice {invoice_number} has been generated.
+
+*Amount:* RM {amount:,.2f}
+*Due Date:* {due_date}
+
+You can view and pay your invoice here:
+{view_url}
+
+Thank you!
+
+_Eternalgy Invoicing System_"""
+
+
 class WhatsAppService:
     def __init__(self):
         self.base_url = settings.WHATSAPP_API_URL
+        # One pooled client for the process - keeps connections (and TLS sessions) alive between sends
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        )
+        # Outbound queue of (phone, message, future) - None until start() (sends then go inline)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    def start(self, workers: int = _SEND_WORKERS) -> None:
+        """Start the background send workers (app startup - needs the running event loop)"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._send_worker()) for _ in range(workers)]
+
+    async def aclose(self, drain_timeout: float = _DRAIN_TIMEOUT) -> None:
+        """
+        Stop the send workers and close the pooled HTTP client (app shutdown)
+        Queued messages get drain_timeout seconds to send; whatever is left resolves
+        with a failure result so no awaiting caller hangs
+        """
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_result(dict(_SHUTDOWN_RESULT))
+        self._workers = []
+        self._queue = None
+        await self._client.aclose()
+
+    async def _send_worker(self) -> None:
+        """Drain the outbound queue - one send at a time per worker, over the shared client"""
+        while True:
+            phone, message, future = await self._queue.get()
+            # Failure result unless the send completes (worker cancelled mid-send at shutdown)
+            result = _SHUTDOWN_RESULT
+            try:
+                result = await self._post_message(phone, message)
+            finally:
+                # The caller may have gone away (cancelled request) - the message is still sent
+                if not future.done():
+                    future.set_result(dict(result))
+                self._queue.task_done()
+
+    def enqueue(self, phone: str, message: str) -> asyncio.Future:
+        """
+        Queue a WhatsApp message for the send workers and return without waiting
+        Await the returned future for the response dict (fire-and-forget callers can ignore it)
+        """
+        if self._queue is None:
+            # Workers not started (scripts, one-off tasks) - send as its own task
+            return asyncio.ensure_future(self._post_message(phone, message))
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((phone, message, future))
+        return future
 
     async def check_status(self) -> dict:
         """Check if WhatsApp service is ready"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(f"{self.base_url}/status")
-                return response.json()
+            response = await self._client.get("/status", timeout=10.0)
+            return response.json()
         except Exception as e:
             return {"ready": False, "error": str(e)}
 
     async def send_message(self, phone: str, message: str) -> dict:
         """
-        Send a WhatsApp message
+        Send a WhatsApp message (through the outbound queue)
 
         Args:
             phone: Phone number with country code (digits only)
@@ -28,21 +131,46 @@ class WhatsAppService:
         Returns:
             Response dict with success status
         """
+        return await self.enqueue(phone, message)
+
+    async def _post_message(self, phone: str, message: str) -> dict:
+        """POST one message to the gateway - never raises, failures come back as {"success": False}"""
         try:
             formatted_phone = format_phone_number(phone)
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/send",
-                    json={
-                        "to": formatted_phone,
-                        "message": message
-                    }
-                )
-                return response.json()
+            response = await self._client.post(
+                "/send",
+                json={
+                    "to": formatted_phone,
+                    "message": message
+                }
+            )
+            return response.json()
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    async def send_messages(self, messages: List[Tuple[str, str]]) -> List[dict]:
+        """
+        Send several WhatsApp messages concurrently
+        Bounded by the send workers, or by _SEND_CONCURRENCY when they are not running
+
+        Args:
+            messages: (phone, message) pairs
+
+        Returns:
+            One response dict per pair, in input order (failures are {"success": False, ...})
+        """
+        if self._queue is not None:
+            return await asyncio.gather(*(self.send_message(phone, message) for phone, message in messages))
+
+        semaphore = asyncio.Semaphore(_SEND_CONCURRENCY)
+
+        async def send_one(phone: str, message: str) -> dict:
+            async with semaphore:
+                return await self.send_message(phone, message)
+
+        return await asyncio.gather(*(send_one(phone, message) for phone, message in messages))
+
     async def send_otp(self, phone: str, otp_code: str, name: Optional[str] = None) -> bool:
         """
         Send OTP via WhatsApp
@@ -56,15 +184,7 @@ class WhatsAppService:
             True if sent successfully, False otherwise
         """
         greeting = f"Hi {name}," if name else "Hi,"
-        message = f"""🔐 *Your Verification Code*
-
-{greeting}
-
-Your OTP code is: *{otp_code}*
-
-Valid for 30 minutes. Do not share this code with anyone.
-
-_Eternalgy Invoicing System_"""
+        message = _OTP_TEMPLATE.format_map({"greeting": greeting, "otp_code": otp_code})
 
         result = await self.send_message(phone, message)
         return result.get("success", False)
@@ -79,21 +199,13 @@ _Eternalgy Invoicing System_"""
         view_url: str
     ) -> bool:
         """Send invoice notification via WhatsApp"""
-        message = f"""📄 *New Invoice*
-
-Dear {customer_name},
-
-Your invoice {invoice_number} has been generated.
-
-*Amount:* RM {amount:,.2f}
-*Due Date:* {due_date}
-
-You can view and pay your invoice here:
-{view_url}
-
-Thank you!
-
-_Eternalgy Invoicing System_"""
+        message = _INVOICE_NOTIFICATION_TEMPLATE.format_map({
+            "customer_name": customer_name,
+            "invoice_number": invoice_number,
+            "amount": amount,
+            "due_date": due_date,
+            "view_url": view_url,
+        })
 
         result = await self.send_message(phone, message)
         return result.get("success", False)
@@ -1,13 +1,33 @@
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import List, Optional
 
 
+# Compiled once at import (hot path: every WhatsApp send / template save)
+_NON_DIGIT = re.compile(r"\D")
+# str.translate table deleting every non-digit Latin-1 character (covers +, -, spaces, parentheses)
+_NON_DIGIT_TABLE = dict.fromkeys(c for c in range(256) if not 0x30 <= c <= 0x39)
+# Malaysian SST format: ST followed by numbers (e.g., ST00123456789)
+_SST_NUMBER = re.compile(r"ST\d{10,12}")
+
+
+@lru_cache(maxsize=4096)
 def format_phone_number(phone: str) -> str:
     """
     Format phone number to digits only (for WhatsApp API)
     Removes +, -, spaces, parentheses
+    Memoized - the same customer numbers come back for OTPs and notifications
     """
-    return re.sub(r"[^\d]", "", phone)
+    digits = phone.translate(_NON_DIGIT_TABLE)
+    if digits.isascii():
+        return digits
+    # Non-Latin-1 characters left (e.g. unicode dashes) - the regex handles the general case
+    return _NON_DIGIT.sub("", digits)
+
+
+def format_phone_numbers(phones: List[str]) -> List[str]:
+    """Format a batch of phone numbers (bulk notification jobs)"""
+    return [format_phone_number(phone) for phone in phones]
 
 
 def is_valid_phone_number(phone: str) -> bool:
@@ -25,6 +45,4 @@ def validate_sst_number(sst_no: str) -> bool:
     """Validate SST registration number (basic check)"""
     if not sst_no:
         return False
-    # Malaysian SST format: ST followed by numbers (e.g., ST00123456789)
-    pattern = r"^ST\d{10,12}$"
-    return re.match(pattern, sst_no.upper()) is not None
+    return _SST_NUMBER.fullmatch(sst_no.upper()) is not None
@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, List, Sequence
+from sqlalchemy import and_, or_, false, literal, text, DateTime
+
+
+# Planner row estimate - maintained by autovacuum/ANALYZE, -1 if never analyzed
+_ESTIMATED_COUNT = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)")
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Encode the sort-key values of the last row of a page as an opaque cursor"""
+    raw = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(raw).encode()).decode()
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List:
+    """Decode a cursor back into sort-key values for columns. Raises ValueError if malformed"""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(raw, list) or len(raw) != len(columns):
+        raise ValueError("Invalid cursor")
+    return [_cursor_value(column, value) for column, value in zip(columns, raw)]
+
+
+def _cursor_value(column, value):
+    """
+    Check a decoded cursor value against its column's Python type (cursors come from clients)
+    Raises ValueError so a tampered cursor is a 400, not a TypeError or a database error
+    """
+    if value is None:
+        return value
+    if isinstance(column.type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError("Invalid cursor")
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError as e:
+            raise ValueError("Invalid cursor") from e
+    expected = column.type.python_type
+    # bool is an int subclass - keep True/False out of integer slots (and 0/1 out of boolean ones)
+    if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def keyset_after(columns: Sequence, values: Sequence):
+    """
+    Predicate for rows after the cursor row, for ORDER BY columns DESC NULLS LAST
+    The last column must be unique and non-null (e.g. id) so the order is total
+    """
+    clauses = []
+    ties = []
+    for column, value in zip(columns, values):
+        if value is None:
+            # Nothing sorts after NULL (NULLS LAST) - only ties continue to the next column
+            after = false()
+            tie = column.is_(None)
+        else:
+            # Bound as a literal so booleans compare with < like any other value
+            value = literal(value, column.type)
+            after = or_(column < value, column.is_(None))
+            tie = column == value
+        clauses.append(and_(*ties, after))
+        ties.append(tie)
+    return or_(*clauses)
+
+
+def keyset_page(query, columns: Sequence, limit: int, cursor: Optional[str] = None, skip: int = 0):
+    """
+    Fetch one keyset page ordered by columns DESC NULLS LAST
+    skip is only applied without a cursor (numbered-page jumps)
+    Returns (rows, next_cursor) - next_cursor is None on the last page
+    """
+    if limit <= 0:
+        # Empty page - no query
+        return [], None
+    if cursor:
+        query = query.filter(keyset_after(columns, decode_cursor(cursor, columns)))
+    query = query.order_by(*[column.desc().nullslast() for column in columns])
+    if skip and not cursor:
+        query = query.offset(skip)
+    # limit + 1 detects a next page without a COUNT
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return rows, next_cursor
+
+
+def count_rows(db, query, table: str, filtered: bool) -> int:
+    """
+    Row count for a list endpoint
+    Unfiltered lists use the pg_class.reltuples estimate (no table scan); filtered lists COUNT exactly
+    """
+    if not filtered:
+        estimate = db.scalar(_ESTIMATED_COUNT, {"table": table})
+        if estimate is not None and estimate >= 0:
+            return estimate
+    return query.count()
@@ -1,4 +1,6 @@
 import secrets
+import hashlib
+import hmac
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
@@ -43,6 +45,21 @@ def generate_share_token() -> str:
     return secrets.token_urlsafe(32)
 
 
+def hash_api_key_secret(key_secret: str) -> str:
+    """Hash an API key secret for storage as "<alg>$<hexdigest>" (BLAKE2b-256)"""
+    digest = hashlib.blake2b(key_secret.encode(), digest_size=32).hexdigest()
+    return f"blake2b${digest}"
+
+
+def verify_api_key_secret(key_secret: str, key_hash: str) -> bool:
+    """Verify an API key secret against a stored hash (legacy unprefixed hashes are SHA-256)"""
+    if key_hash.startswith("blake2b$"):
+        expected = hash_api_key_secret(key_secret)
+    else:
+        expected = hashlib.sha256(key_secret.encode()).hexdigest()
+    return hmac.compare_digest(expected, key_hash)
+
+
 def generate_invoice_number() -> str:
     """Generate a unique invoice number (placeholder - actual implementation will query DB)"""
     # This will be replaced with actual DB logic
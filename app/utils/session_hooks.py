@@ -0,0 +1,32 @@
+from typing import Callable, Hashable
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+# session.info keys - pending callbacks, and a flag set once the listeners are attached
+_PENDING_KEY = "_on_commit_callbacks"
+_LISTENING_KEY = "_on_commit_listening"
+
+
+def _run_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        for callback in pending.values():
+            callback()
+
+
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def on_commit(session: Session, key: Hashable, callback: Callable[[], None]) -> None:
+    """
+    Run callback once the session's current transaction commits (dropped on rollback)
+    Callbacks are de-duplicated by key, so repeated writes in one transaction run it once;
+    the session gets a single pair of listeners however many callbacks are queued
+    """
+    session.info.setdefault(_PENDING_KEY, {})[key] = callback
+    if not session.info.get(_LISTENING_KEY):
+        event.listen(session, "after_commit", _run_pending)
+        event.listen(session, "after_rollback", _discard_pending)
+        session.info[_LISTENING_KEY] = True
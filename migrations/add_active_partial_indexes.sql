@@ -0,0 +1,30 @@
+-- Migration: Partial indexes for active-only list queries and the default template lookup
+-- Date: 2026-10-16
+-- Description: list_packages(active_only=True), list_products and
+--              TemplateRepository.get_all filter on active = true, and the
+--              default-template lookups filter on is_default = true AND active = true.
+--              A btree on the boolean alone is useless; these partial indexes
+--              hold only the matching rows, in the keyset order the lists page by
+--              (app/utils/pagination.py). SQLAlchemy renders these filters as
+--              "active = true", which the planner folds to the bare column, so
+--              they prove the WHERE active predicates below.
+
+CREATE INDEX IF NOT EXISTS ix_package_active_created
+    ON package (created_date DESC NULLS LAST, id DESC)
+    WHERE active;
+
+CREATE INDEX IF NOT EXISTS ix_product_active_created
+    ON product (created_date DESC NULLS LAST, id DESC)
+    WHERE active;
+
+CREATE INDEX IF NOT EXISTS ix_product_active_brand
+    ON product (linked_brand, created_date DESC NULLS LAST, id DESC)
+    WHERE active;
+
+CREATE INDEX IF NOT EXISTS ix_invoice_template_active_default_created
+    ON invoice_template (is_default DESC NULLS LAST, created_at DESC NULLS LAST, id DESC)
+    WHERE active;
+
+CREATE INDEX IF NOT EXISTS ix_invoice_template_default
+    ON invoice_template (bubble_id)
+    WHERE is_default AND active;
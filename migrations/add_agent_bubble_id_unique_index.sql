@@ -0,0 +1,8 @@
+-- Migration: Unique index on agent.bubble_id
+-- Date: 2026-10-16
+-- Description: UserRepository.update_user creates or updates the linked agent
+--              profile with one INSERT ... ON CONFLICT (bubble_id) DO UPDATE,
+--              which needs a unique index on agent.bubble_id to infer the
+--              conflict target. Skip if the table already has one.
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_agent_bubble_id_unique ON agent (bubble_id);
@@ -0,0 +1,18 @@
+-- Migration: Trigram indexes for package/product/brand search
+-- Date: 2026-10-16
+-- Description: list_packages/list_products/list_brands search with ILIKE '%term%'.
+--              GIN gin_trgm_ops indexes let PostgreSQL answer those substring
+--              matches from the index (bitmap scan) instead of a sequential scan,
+--              without changing which rows match.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_package_name_trgm ON package USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_package_invoice_desc_trgm ON package USING gin (invoice_desc gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_package_description_trgm ON package USING gin (description gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_product_name_trgm ON product USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_product_description_trgm ON product USING gin (description gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_product_label_trgm ON product USING gin (label gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_brand_name_trgm ON brand USING gin (name gin_trgm_ops);
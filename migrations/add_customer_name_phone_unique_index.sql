@@ -0,0 +1,14 @@
+-- Migration: Unique index on customer (lower(name), phone)
+-- Date: 2026-10-16
+-- Description: InvoiceRepository.create_on_the_fly finds-or-creates the customer with
+--              INSERT ... ON CONFLICT on this index, so concurrent calls for the same
+--              name/phone cannot create duplicates. NULL phones never conflict, so
+--              without a phone create_on_the_fly reuses a customer with the same name
+--              (lower(name) is the leading column, so that lookup uses this index too).
+--              The expressions must match _CUSTOMER_CONFLICT_TARGET in invoice_repo.py.
+--              Check for existing duplicates first if this fails:
+--              SELECT lower(name), phone, COUNT(*) FROM customer
+--              WHERE phone IS NOT NULL GROUP BY 1, 2 HAVING COUNT(*) > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_customer_name_phone
+    ON customer (lower(name), phone);
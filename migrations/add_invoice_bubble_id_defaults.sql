@@ -0,0 +1,14 @@
+-- Migration: Server-side bubble_id defaults for invoice_new / invoice_new_item
+-- Date: 2026-10-16
+-- Description: Generate bubble_ids in the database instead of the application.
+--              The ORM models declare matching server defaults with eager_defaults,
+--              so the generated id comes back through RETURNING on the same INSERT.
+--              Format is unchanged: inv_/item_ followed by 16 hex characters.
+
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+ALTER TABLE invoice_new
+    ALTER COLUMN bubble_id SET DEFAULT 'inv_' || encode(gen_random_bytes(8), 'hex');
+
+ALTER TABLE invoice_new_item
+    ALTER COLUMN bubble_id SET DEFAULT 'item_' || encode(gen_random_bytes(8), 'hex');
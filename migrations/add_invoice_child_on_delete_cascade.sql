@@ -0,0 +1,30 @@
+-- Migration: ON DELETE CASCADE for invoice_new_item / invoice_payment_new
+-- Date: 2026-10-16
+-- Description: InvoiceRepository.delete issues a single DELETE on invoice_new and
+--              relies on the database to remove the invoice's items and payments.
+--              Replaces any existing FK from these tables to invoice_new with a
+--              cascading one.
+
+DO $$
+DECLARE
+    r RECORD;
+BEGIN
+    FOR r IN
+        SELECT con.conname, rel.relname
+        FROM pg_constraint con
+        JOIN pg_class rel ON rel.oid = con.conrelid
+        WHERE con.contype = 'f'
+          AND rel.relname IN ('invoice_new_item', 'invoice_payment_new')
+          AND con.confrelid = 'invoice_new'::regclass
+    LOOP
+        EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', r.relname, r.conname);
+    END LOOP;
+END $$;
+
+ALTER TABLE invoice_new_item
+    ADD CONSTRAINT invoice_new_item_invoice_id_fkey
+    FOREIGN KEY (invoice_id) REFERENCES invoice_new(bubble_id) ON DELETE CASCADE;
+
+ALTER TABLE invoice_payment_new
+    ADD CONSTRAINT invoice_payment_new_invoice_id_fkey
+    FOREIGN KEY (invoice_id) REFERENCES invoice_new(bubble_id) ON DELETE CASCADE;
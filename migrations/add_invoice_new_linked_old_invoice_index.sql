@@ -0,0 +1,12 @@
+-- Migration: Add unique index on invoice_new.linked_old_invoice
+-- Date: 2026-10-16
+-- Description: InvoiceRepository.get_unmigrated_old_invoices anti-joins invoice
+--              against invoice_new on linked_old_invoice. Each old invoice is
+--              migrated at most once, so the index is unique (NULLs excluded).
+--              Check for duplicates first if this fails:
+--              SELECT linked_old_invoice, COUNT(*) FROM invoice_new
+--              WHERE linked_old_invoice IS NOT NULL GROUP BY 1 HAVING COUNT(*) > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_invoice_new_linked_old_invoice
+    ON invoice_new(linked_old_invoice)
+    WHERE linked_old_invoice IS NOT NULL;
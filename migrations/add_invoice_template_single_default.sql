@@ -0,0 +1,23 @@
+-- Migration: At most one default invoice_template
+-- Date: 2026-10-16
+-- Description: TemplateRepository moves the default flag with a single
+--              UPDATE ... SET is_default = (bubble_id = :id). A plain partial unique
+--              index is checked row by row and can fail mid-statement, so the
+--              invariant is a DEFERRABLE exclusion constraint instead (checked at
+--              the end of each statement).
+--              Existing extra defaults are cleared first, keeping the most recently
+--              updated one.
+
+UPDATE invoice_template SET is_default = FALSE
+WHERE is_default
+  AND id <> (
+      SELECT id FROM invoice_template
+      WHERE is_default
+      ORDER BY updated_at DESC NULLS LAST, id DESC
+      LIMIT 1
+  );
+
+ALTER TABLE invoice_template
+    ADD CONSTRAINT invoice_template_single_default
+    EXCLUDE USING btree (is_default WITH =) WHERE (is_default)
+    DEFERRABLE INITIALLY IMMEDIATE;
@@ -0,0 +1,18 @@
+-- Migration: Keyset pagination indexes for package/product/brand/invoice_template lists
+-- Date: 2026-10-16
+-- Description: PackageRepository.list_packages/list_products/list_brands and
+--              TemplateRepository.get_all page with WHERE (sort key) < (cursor)
+--              ... ORDER BY ... DESC NULLS LAST, id DESC LIMIT n+1 (app/utils/pagination.py).
+--              These indexes match that order so each page is an index range scan.
+
+CREATE INDEX IF NOT EXISTS idx_package_created_date_id
+    ON package (created_date DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_product_created_date_id
+    ON product (created_date DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_brand_created_date_id
+    ON brand (created_date DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_invoice_template_default_created_id
+    ON invoice_template (is_default DESC NULLS LAST, created_at DESC NULLS LAST, id DESC);
@@ -0,0 +1,22 @@
+-- Migration: Full-text search column for products
+-- Date: 2026-10-16
+-- Description: list_products used to OR three ILIKE '%term%' filters over
+--              name/label/description. It now matches one generated tsvector
+--              (name weighted A, label B, description C) with
+--              search_vec @@ websearch_to_tsquery('simple', :search), served by
+--              a single GIN index. The product trigram indexes are no longer
+--              used by any query and are dropped.
+--              Adding a STORED generated column rewrites the table - run in a quiet window.
+
+ALTER TABLE product ADD COLUMN IF NOT EXISTS search_vec tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(label, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_product_search ON product USING gin (search_vec);
+
+DROP INDEX IF EXISTS idx_product_name_trgm;
+DROP INDEX IF EXISTS idx_product_description_trgm;
+DROP INDEX IF EXISTS idx_product_label_trgm;
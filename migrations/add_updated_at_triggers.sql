@@ -0,0 +1,24 @@
+-- Migration: Stamp updated_at on "user" and agent with a trigger
+-- Date: 2026-10-16
+-- Description: UserRepository appended updated_at = NOW() to every UPDATE of
+--              "user" and to the agent upsert's ON CONFLICT DO UPDATE. A
+--              BEFORE UPDATE trigger now sets it for every update, from any
+--              writer, so the application SQL no longer carries it. INSERTs
+--              still set created_at/updated_at explicitly.
+
+CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS user_set_updated_at ON "user";
+CREATE TRIGGER user_set_updated_at
+    BEFORE UPDATE ON "user"
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS agent_set_updated_at ON agent;
+CREATE TRIGGER agent_set_updated_at
+    BEFORE UPDATE ON agent
+    FOR EACH ROW EXECUTE FUNCTION set_updated_at();
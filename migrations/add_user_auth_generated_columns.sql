@@ -0,0 +1,29 @@
+-- Migration: Generated email/whatsapp columns on "user"
+-- Date: 2026-10-16
+-- Description: UserRepository.get_all/get_by_id fell back to the email and
+--              WhatsApp number inside the authentication JSON through CASE
+--              ladders of authentication::jsonb->... on every row, in the
+--              SELECT list, the search WHERE and the name/email ORDER BY.
+--              These STORED columns extract them once at write time:
+--                auth_email    = authentication->'email'->>'email'
+--                auth_whatsapp = whatsapp number/phone (object or string),
+--                                else the top-level phone
+--              Adding a STORED generated column rewrites the table - run in a quiet window.
+
+ALTER TABLE "user" ADD COLUMN IF NOT EXISTS auth_email text
+    GENERATED ALWAYS AS ((authentication::jsonb -> 'email') ->> 'email') STORED;
+
+ALTER TABLE "user" ADD COLUMN IF NOT EXISTS auth_whatsapp text
+    GENERATED ALWAYS AS (
+        COALESCE(
+            CASE
+                WHEN jsonb_typeof(authentication::jsonb -> 'whatsapp') = 'object'
+                THEN COALESCE(
+                    (authentication::jsonb -> 'whatsapp') ->> 'number',
+                    (authentication::jsonb -> 'whatsapp') ->> 'phone'
+                )
+                ELSE authentication::jsonb ->> 'whatsapp'
+            END,
+            authentication::jsonb ->> 'phone'
+        )
+    ) STORED;
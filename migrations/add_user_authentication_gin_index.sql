@@ -0,0 +1,9 @@
+-- Migration: Add GIN index on user.authentication for WhatsApp lookups
+-- Date: 2026-10-16
+-- Description: AuthRepository looks up users with JSONB containment
+--              (authentication::jsonb @> '{"whatsapp": "..."}') instead of
+--              LIKE '%...%' over authentication::text. jsonb_path_ops supports @>
+--              and turns the lookup into an index scan.
+
+CREATE INDEX IF NOT EXISTS user_auth_gin
+    ON "user" USING gin ((authentication::jsonb) jsonb_path_ops);
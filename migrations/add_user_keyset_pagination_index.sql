@@ -0,0 +1,12 @@
+-- Migration: Keyset pagination index for the user list
+-- Date: 2026-10-16
+-- Description: UserRepository.get_all pages with WHERE (sort key, bubble_id)
+--              past the cursor ... ORDER BY sort key DESC NULLS LAST,
+--              bubble_id DESC LIMIT n+1 instead of OFFSET. This index matches
+--              the default registration_date order so each page is an index
+--              range scan. The name/email sort keys COALESCE agent columns with
+--              the authentication JSON across the join, so no single-table
+--              index can serve them.
+
+CREATE INDEX IF NOT EXISTS idx_user_created_date_bubble_id
+    ON "user" (created_date DESC NULLS LAST, bubble_id DESC);
@@ -0,0 +1,15 @@
+-- Migration: Prefix-search indexes for the user list
+-- Date: 2026-10-16
+-- Description: UserRepository.get_all(search_mode="prefix") matches
+--              lower(col) LIKE 'term%' (autocomplete) instead of
+--              ILIKE '%term%'. A btree on lower(col) with text_pattern_ops
+--              answers a left-anchored LIKE as an index range scan, whatever
+--              the database collation. The trigram indexes still serve the
+--              default "contains" mode.
+
+CREATE INDEX IF NOT EXISTS idx_agent_name_lower_pattern ON agent (lower(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_agent_contact_lower_pattern ON agent (lower(contact) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_agent_email_lower_pattern ON agent (lower(email) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_user_bubble_id_lower_pattern ON "user" (lower(bubble_id) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_user_auth_email_lower_pattern ON "user" (lower(auth_email) text_pattern_ops);
@@ -0,0 +1,20 @@
+-- Migration: Trigram indexes for user search
+-- Date: 2026-10-16
+-- Description: UserRepository.get_all searches with ILIKE '%term%' on
+--              agent name/contact/email and user bubble_id/auth_email. The
+--              search matches the user and agent tables in separate branches
+--              of an id IN (...) subquery, so each branch is a bitmap OR over
+--              these GIN gin_trgm_ops indexes instead of a sequential scan of
+--              the join. The agent branch joins back to "user" on
+--              linked_agent_profile.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_agent_name_trgm ON agent USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_agent_contact_trgm ON agent USING gin (contact gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_agent_email_trgm ON agent USING gin (email gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_user_bubble_id_trgm ON "user" USING gin (bubble_id gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_user_auth_email_trgm ON "user" USING gin (auth_email gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_user_linked_agent_profile ON "user" (linked_agent_profile);
@@ -0,0 +1,22 @@
+-- Migration: Return access_level as an empty array instead of NULL from user_with_agent
+-- Date: 2026-10-16
+-- Description: UserRepository turned a NULL access_level into [] in Python for
+--              every row (list(row.access_level) if row.access_level else []).
+--              The view now does COALESCE(access_level, '{}'), so the driver
+--              hands back a ready list. Same columns and types, so CREATE OR
+--              REPLACE is enough.
+
+CREATE OR REPLACE VIEW user_with_agent AS
+SELECT
+    u.id AS user_id,
+    u.bubble_id AS user_bubble_id,
+    u.created_date AS registration_date,
+    u.linked_agent_profile,
+    COALESCE(u.access_level, '{}') AS access_level,
+    a.bubble_id AS agent_bubble_id,
+    a.contact AS agent_contact,
+    COALESCE(a.name, u.auth_email) AS name,
+    COALESCE(a.contact, u.auth_whatsapp) AS whatsapp_number,
+    COALESCE(a.email, u.auth_email) AS email
+FROM "user" u
+LEFT JOIN agent a ON u.linked_agent_profile = a.bubble_id;
@@ -0,0 +1,40 @@
+-- Migration: Store user.authentication as jsonb
+-- Date: 2026-10-16
+-- Description: authentication was TEXT, so every authentication::jsonb in the
+--              WhatsApp lookup (AuthRepository) and the auth_email/auth_whatsapp
+--              generated columns re-parsed the whole document. As jsonb it is
+--              stored parsed and the casts go away.
+--              A column used by generated columns cannot change type, so they
+--              are dropped and re-added, and the GIN index moves from the
+--              (authentication::jsonb) expression to the column itself.
+--              Rewrites the table - run in a quiet window.
+
+BEGIN;
+
+DROP INDEX IF EXISTS user_auth_gin;
+ALTER TABLE "user" DROP COLUMN IF EXISTS auth_email;
+ALTER TABLE "user" DROP COLUMN IF EXISTS auth_whatsapp;
+
+ALTER TABLE "user" ALTER COLUMN authentication TYPE jsonb USING authentication::jsonb;
+
+ALTER TABLE "user" ADD COLUMN auth_email text
+    GENERATED ALWAYS AS ((authentication -> 'email') ->> 'email') STORED;
+
+ALTER TABLE "user" ADD COLUMN auth_whatsapp text
+    GENERATED ALWAYS AS (
+        COALESCE(
+            CASE
+                WHEN jsonb_typeof(authentication -> 'whatsapp') = 'object'
+                THEN COALESCE(
+                    (authentication -> 'whatsapp') ->> 'number',
+                    (authentication -> 'whatsapp') ->> 'phone'
+                )
+                ELSE authentication ->> 'whatsapp'
+            END,
+            authentication ->> 'phone'
+        )
+    ) STORED;
+
+CREATE INDEX user_auth_gin ON "user" USING gin (authentication jsonb_path_ops);
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Migration: Create invoice_number_seq for invoice number allocation
+-- Date: 2026-10-16
+-- Description: InvoiceRepository._generate_invoice_number takes the next number from
+--              this sequence instead of SELECT ... ORDER BY invoice_number DESC LIMIT 1.
+--              The sequence is started after the highest existing INV-<digits> number.
+
+CREATE SEQUENCE IF NOT EXISTS invoice_number_seq;
+
+SELECT setval(
+    'invoice_number_seq',
+    COALESCE(
+        (SELECT MAX(CAST(substring(invoice_number FROM '^INV-(\d+)$') AS BIGINT)) FROM invoice_new),
+        0
+    ) + 1,
+    false
+);
@@ -0,0 +1,69 @@
+-- Migration: package_item_link junction table
+-- Date: 2026-10-16
+-- Description: package.linked_package_item (text[] of package_item bubble_ids) cannot
+--              be joined with an index or protected by FKs. package_item_link holds
+--              one row per (package, item) with the array position as sort_order,
+--              and PackageRepository.get_items_for_packages joins through it.
+--              The array column stays: it is written by the Bubble sync and the
+--              package API, so triggers keep the link table in step with it
+--              (package insert/array update, and items that arrive after their package).
+--              Links to item ids that do not exist in package_item are skipped.
+
+CREATE TABLE IF NOT EXISTS package_item_link (
+    package_bubble_id VARCHAR NOT NULL REFERENCES package(bubble_id) ON DELETE CASCADE,
+    item_bubble_id VARCHAR NOT NULL REFERENCES package_item(bubble_id) ON DELETE CASCADE,
+    sort_order INTEGER NOT NULL,
+    PRIMARY KEY (package_bubble_id, sort_order)
+);
+
+CREATE INDEX IF NOT EXISTS idx_package_item_link_item ON package_item_link (item_bubble_id);
+
+-- Finds the packages that reference a newly inserted item
+CREATE INDEX IF NOT EXISTS idx_package_linked_package_item_gin
+    ON package USING gin (linked_package_item);
+
+-- Rebuild a package's links from its array
+CREATE OR REPLACE FUNCTION sync_package_item_link() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM package_item_link WHERE package_bubble_id = NEW.bubble_id;
+    INSERT INTO package_item_link (package_bubble_id, item_bubble_id, sort_order)
+    SELECT NEW.bubble_id, u.item_id, u.ord
+    FROM unnest(NEW.linked_package_item) WITH ORDINALITY AS u(item_id, ord)
+    JOIN package_item pi ON pi.bubble_id = u.item_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS package_item_link_sync ON package;
+CREATE TRIGGER package_item_link_sync
+    AFTER INSERT OR UPDATE OF linked_package_item ON package
+    FOR EACH ROW EXECUTE FUNCTION sync_package_item_link();
+
+-- Link an item to packages whose array already referenced it
+CREATE OR REPLACE FUNCTION link_new_package_item() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO package_item_link (package_bubble_id, item_bubble_id, sort_order)
+    SELECT p.bubble_id, NEW.bubble_id, u.ord
+    FROM package p
+    CROSS JOIN LATERAL unnest(p.linked_package_item) WITH ORDINALITY AS u(item_id, ord)
+    WHERE p.linked_package_item @> ARRAY[NEW.bubble_id]::VARCHAR[]
+      AND u.item_id = NEW.bubble_id
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS package_item_link_new_item ON package_item;
+CREATE TRIGGER package_item_link_new_item
+    AFTER INSERT ON package_item
+    FOR EACH ROW EXECUTE FUNCTION link_new_package_item();
+
+-- Backfill from the existing arrays
+INSERT INTO package_item_link (package_bubble_id, item_bubble_id, sort_order)
+SELECT p.bubble_id, u.item_id, u.ord
+FROM package p
+CROSS JOIN LATERAL unnest(p.linked_package_item) WITH ORDINALITY AS u(item_id, ord)
+JOIN package_item pi ON pi.bubble_id = u.item_id
+ON CONFLICT DO NOTHING;
+
+ANALYZE package_item_link;
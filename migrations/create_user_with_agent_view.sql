@@ -0,0 +1,27 @@
+-- Migration: user_with_agent view
+-- Date: 2026-10-16
+-- Description: UserRepository.get_all and get_by_id each spelled out the same
+--              "user" LEFT JOIN agent projection, with name/whatsapp/email falling
+--              back from the agent profile to the auth_email/auth_whatsapp
+--              generated columns. Both now read this view, so the projection is
+--              defined once. It is a plain view: Postgres inlines it, so
+--              predicates and ORDER BY still reach the "user" indexes.
+--              agent_contact (the raw agent contact) is the whatsapp sort key;
+--              user_id feeds the search subquery.
+--              Requires add_user_auth_generated_columns.sql.
+
+CREATE OR REPLACE VIEW user_with_agent AS
+SELECT
+    u.id AS user_id,
+    u.bubble_id AS user_bubble_id,
+    u.created_date AS registration_date,
+    u.linked_agent_profile,
+    u.access_level,
+    u.authentication,
+    a.bubble_id AS agent_bubble_id,
+    a.contact AS agent_contact,
+    COALESCE(a.name, u.auth_email) AS name,
+    COALESCE(a.contact, u.auth_whatsapp) AS whatsapp_number,
+    COALESCE(a.email, u.auth_email) AS email
+FROM "user" u
+LEFT JOIN agent a ON u.linked_agent_profile = a.bubble_id;
@@ -0,0 +1,27 @@
+-- Migration: Drop authentication from the user_with_agent view
+-- Date: 2026-10-16
+-- Description: No query reads authentication through user_with_agent any more -
+--              name/whatsapp/email come from the auth_email/auth_whatsapp
+--              generated columns. CREATE OR REPLACE VIEW cannot drop a column,
+--              so the view is re-created without it.
+
+BEGIN;
+
+DROP VIEW IF EXISTS user_with_agent;
+
+CREATE VIEW user_with_agent AS
+SELECT
+    u.id AS user_id,
+    u.bubble_id AS user_bubble_id,
+    u.created_date AS registration_date,
+    u.linked_agent_profile,
+    u.access_level,
+    a.bubble_id AS agent_bubble_id,
+    a.contact AS agent_contact,
+    COALESCE(a.name, u.auth_email) AS name,
+    COALESCE(a.contact, u.auth_whatsapp) AS whatsapp_number,
+    COALESCE(a.email, u.auth_email) AS email
+FROM "user" u
+LEFT JOIN agent a ON u.linked_agent_profile = a.bubble_id;
+
+COMMIT;